@@ -1,7 +1,59 @@
 # claims/admin.py
 from django.contrib import admin
+from django.core.paginator import EmptyPage, Paginator
+from django.utils.functional import cached_property
+
+from .counting import count_claims
 from .models import Claim, ClaimDetail, ClaimNote
 
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Exact count for small changelists, planner/counter estimate above the
+    threshold. The estimate only labels the total: it can fall short of the
+    real row count, so pages past the estimated last one stay valid while
+    they have rows, and the page links grow one page at a time.
+    """
+
+    _reached = 0  # furthest page known to exist, past the estimate
+
+    @cached_property
+    def result_count(self):
+        return count_claims(self.object_list)
+
+    @cached_property
+    def count(self):
+        return int(self.result_count)
+
+    @property
+    def approximate(self):
+        return not self.result_count.exact
+
+    @property
+    def num_pages(self):
+        pages = super().num_pages
+        return max(pages, self._reached) if self.approximate else pages
+
+    def _has_rows_from(self, offset):
+        return self.object_list[offset:offset + 1].exists()
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.approximate or int(number) < 1 or not self._has_rows_from((int(number) - 1) * self.per_page):
+                raise
+            return int(number)
+
+    def page(self, number):
+        if not self.approximate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom, top = (number - 1) * self.per_page, number * self.per_page
+        self._reached = max(self._reached, number + 1 if self._has_rows_from(top) else number)
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+
 class FlaggedFilter(admin.SimpleListFilter):
     title = "flagged"
     parameter_name = "flagged"
@@ -25,5 +77,8 @@ class ClaimAdmin(admin.ModelAdmin):
     )
     search_fields = ("claim_id", "patient_name", "payer")
     list_filter = ("status", "payer", FlaggedFilter)   # <- changed
+    # no second unfiltered COUNT(*); totals above the threshold are estimates
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     # Optional: allow quick toggling from the list page (flagged can't be first column)
     # list_editable = ("flagged",)
@@ -0,0 +1,257 @@
+"""
+Optional in-process columnar snapshot of Claim for dashboard aggregates.
+
+With NumPy installed and CLAIMS_ANALYTICS enabled, each process keeps the
+claims' amounts and paid amounts (integer cents), dictionary-encoded status
+and payer codes, service dates and flags in NumPy arrays, and answers the
+dashboard's group-by / sum / avg questions with bincount over those arrays
+instead of SQL. The snapshot is refreshed only when the claims version moves
+(so a steady-state read touches neither the DB nor the cache beyond that one
+get), and then incrementally: rows with a newer last_updated are upserted,
+and deletes, which leave no last_updated behind, are found by comparing the
+maintained row count (counting.claim_row_count) and dropped via a pk-only
+scan. The count only says how many rows exist, not which: an insert that
+commits more than REFRESH_OVERLAP after its last_updated stamp, paired with a
+delete, leaves the count equal and the snapshot off by one row until reset()
+(or the next deploy) reloads it.
+
+Without NumPy (or with the setting off) totals() returns None and callers
+use the SQL / rollup path.
+"""
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .cache import claims_version
+from .counting import claim_row_count
+from .models import Claim
+from .rollup import MEASURES
+
+# columns loaded per claim, in values_list() order
+FIELDS = ("pk", "amount", "paid_amount", "status", "payer", "service_date", "flagged", "last_updated")
+
+# re-read rows updated this long before the newest stamp seen, so commits
+# that land out of last_updated order are not missed (upserts are idempotent)
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+# rows fetched (and converted to columns) per round trip
+LOAD_CHUNK = 5_000
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def enabled():
+    return np is not None and settings.CLAIMS_ANALYTICS
+
+
+def _cents(value):
+    return int((value or 0) * 100)
+
+
+def _money(cents):
+    return Decimal(int(round(cents))).scaleb(-2)
+
+
+class _Codes:
+    """Dictionary encoding of one categorical column (value <-> small int)."""
+
+    def __init__(self):
+        self.values, self.index = [], {}
+
+    def code(self, value):
+        try:
+            return self.index[value]
+        except KeyError:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+            return self.index[value]
+
+
+class ClaimSnapshot:
+    """Column arrays for every claim, sorted by pk."""
+
+    COLUMNS = ("pk", "amount", "paid", "status", "payer", "service_date", "flagged")
+
+    def __init__(self):
+        self.codes = {"status": _Codes(), "payer": _Codes()}
+        self.pk = np.empty(0, dtype=np.int64)
+        self.amount = np.empty(0, dtype=np.int64)
+        self.paid = np.empty(0, dtype=np.int64)
+        self.status = np.empty(0, dtype=np.int32)
+        self.payer = np.empty(0, dtype=np.int32)
+        self.service_date = np.empty(0, dtype="datetime64[D]")
+        self.flagged = np.empty(0, dtype=bool)
+        self.stamp = None
+        self.version = None
+
+    def __len__(self):
+        return len(self.pk)
+
+    def _columns(self, rows):
+        """Column arrays (COLUMNS order) for values_list(*FIELDS) rows."""
+        return (
+            np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((_cents(r[1]) for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((_cents(r[2]) for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((self.codes["status"].code(r[3]) for r in rows), dtype=np.int32, count=len(rows)),
+            np.fromiter((self.codes["payer"].code(r[4]) for r in rows), dtype=np.int32, count=len(rows)),
+            np.array([r[5] for r in rows], dtype="datetime64[D]"),
+            np.fromiter((r[6] for r in rows), dtype=bool, count=len(rows)),
+        )
+
+    def _upsert(self, rows):
+        if not rows:
+            return
+        new = dict(zip(self.COLUMNS, self._columns(rows)))
+        pos = np.searchsorted(self.pk, new["pk"])
+        found = pos < len(self.pk)
+        found[found] = self.pk[pos[found]] == new["pk"][found]
+        for name in self.COLUMNS[1:]:
+            getattr(self, name)[pos[found]] = new[name][found]
+        if not found.all():
+            added = ~found
+            merged = {name: np.concatenate([getattr(self, name), new[name][added]]) for name in self.COLUMNS}
+            order = np.argsort(merged["pk"], kind="stable")
+            for name in self.COLUMNS:
+                setattr(self, name, merged[name][order])
+        stamp = max(r[7] for r in rows)
+        self.stamp = stamp if self.stamp is None else max(self.stamp, stamp)
+
+    def _load(self, rows):
+        """Fill empty arrays from a stream of values_list(*FIELDS) rows, one chunk at a time."""
+        parts, stamp = [], None
+        for chunk in _chunks(rows):
+            parts.append(self._columns(chunk))
+            newest = max(r[7] for r in chunk)
+            stamp = newest if stamp is None else max(stamp, newest)
+        if not parts:
+            return
+        columns = [np.concatenate(c) for c in zip(*parts)]
+        order = np.argsort(columns[0], kind="stable")
+        for name, column in zip(self.COLUMNS, columns):
+            setattr(self, name, column[order])
+        self.stamp = stamp
+
+    def _keep(self, mask):
+        for name in self.COLUMNS:
+            setattr(self, name, getattr(self, name)[mask])
+
+    def refresh(self, version):
+        """Bring the arrays up to date with the DB (see the module docstring)."""
+        rows = Claim.objects.order_by()
+        if self.stamp is None:
+            self._load(rows.values_list(*FIELDS).iterator(chunk_size=LOAD_CHUNK))
+        else:
+            rows = rows.filter(last_updated__gte=self.stamp - REFRESH_OVERLAP)
+            for chunk in _chunks(rows.values_list(*FIELDS).iterator(chunk_size=LOAD_CHUNK)):
+                self._upsert(chunk)
+        # every insert was just upserted, so any surplus is deleted rows
+        # (a missing counter row forces the scan)
+        if len(self) != claim_row_count():
+            live = Claim.objects.order_by().values_list("pk", flat=True).iterator(chunk_size=LOAD_CHUNK)
+            live = np.fromiter(live, dtype=np.int64)
+            self._keep(np.isin(self.pk, live))
+        self.version = version
+
+    # ---------- vectorized aggregates ----------
+    def where(self, status=None, payer=None, service_from=None, service_to=None):
+        """Row mask for ad-hoc filters; unknown status/payer values match nothing."""
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in (("status", status), ("payer", payer)):
+            if value is not None:
+                mask &= getattr(self, name) == self.codes[name].index.get(value, -1)
+        if service_from is not None:
+            mask &= self.service_date >= np.datetime64(service_from, "D")
+        if service_to is not None:
+            mask &= self.service_date <= np.datetime64(service_to, "D")
+        return mask
+
+    def measures(self, mask=None):
+        """Arrays for the rollup MEASURES, per claim (optionally masked)."""
+        amount, paid, flagged = self.amount, self.paid, self.flagged
+        if mask is not None:
+            amount, paid, flagged = amount[mask], paid[mask], flagged[mask]
+        under = amount > paid
+        return {
+            "claims": np.ones(len(amount), dtype=np.int64),
+            "billed": amount,
+            "paid": paid,
+            "underpaid": under,
+            "underpayment": np.where(under, amount - paid, 0),
+            "flagged": flagged,
+        }
+
+    @staticmethod
+    def _as_values(name, total):
+        return _money(total) if name in ("billed", "paid", "underpayment") else int(total)
+
+    def overall(self, mask=None):
+        return {m: self._as_values(m, arr.sum()) for m, arr in self.measures(mask).items()}
+
+    def grouped(self, by, mask=None):
+        """{value of `by` ("status" / "payer"): measures} via one bincount per measure."""
+        codes, labels = getattr(self, by), self.codes[by].values
+        if mask is not None:
+            codes = codes[mask]
+        sums = {
+            m: np.bincount(codes, weights=arr, minlength=len(labels)) if len(codes) else np.zeros(len(labels))
+            for m, arr in self.measures(mask).items()
+        }
+        return {
+            label: {m: self._as_values(m, sums[m][code]) for m in MEASURES}
+            for code, label in enumerate(labels) if sums["claims"][code]
+        }
+
+    def totals(self, limit=10):
+        """Same shape as rollup.totals(): (overall measures, top statuses, top payers)."""
+        def top(kind):
+            ranked = sorted(self.grouped(kind).items(), key=lambda kv: (-kv[1]["claims"], kv[0]))[:limit]
+            return [{kind: key, "n": m["claims"], "billed": m["billed"], "paid": m["paid"]} for key, m in ranked]
+
+        return self.overall(), top("status"), top("payer")
+
+
+def _chunks(rows):
+    """Lists of up to LOAD_CHUNK rows from an iterator."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == LOAD_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _current():
+    """This process's snapshot, refreshed to the current claims version; call under _lock."""
+    global _snapshot
+    version = claims_version()
+    if _snapshot is None:
+        _snapshot = ClaimSnapshot()
+    if _snapshot.version != version:
+        _snapshot.refresh(version)
+    return _snapshot
+
+
+def totals(limit=10):
+    """rollup.totals() from the snapshot, or None when the engine is disabled."""
+    if not enabled():
+        return None
+    with _lock:
+        return _current().totals(limit)
+
+
+def reset():
+    """Drop this process's snapshot (the next read reloads every claim)."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
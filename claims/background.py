@@ -0,0 +1,40 @@
+"""
+Work handed off the request thread.
+
+Each kind of job gets its own lazily started, named ThreadPoolExecutor, so
+a slow bulk update never queues behind detail warming (or the reverse). Tasks
+run wrapped so the worker closes its own DB connections when they finish;
+Django only closes connections at the end of a request, which a worker
+thread never sees.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.db import connections
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def executor(name, workers=1):
+    """The pool called `name`, started with `workers` threads on first use."""
+    with _lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return _pools[name]
+
+
+def closing_connections(fn):
+    @wraps(fn)
+    def run(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connections.close_all()  # this worker thread's connections only
+    return run
+
+
+def submit(name, fn, *args, workers=1, **kwargs):
+    """Run fn(*args, **kwargs) on the `name` pool; returns the Future."""
+    return executor(name, workers).submit(closing_connections(fn), *args, **kwargs)
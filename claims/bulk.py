@@ -0,0 +1,107 @@
+"""
+Set-based bulk edits over a claim_list filter.
+
+Each action is one `UPDATE ... WHERE <filter>` per primary-key range, so no rows
+are pulled into Python and every transaction (and lock) stays short. Progress
+lives in the cache for the polling fragment, and the list/detail caches are
+invalidated once at the end instead of once per claim. Background jobs need a
+shared cache (REDIS_URL): with the per-process default, a poll served by
+another worker finds no job and gets a 404 (see CLAIMS_BULK_BACKGROUND).
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from . import rollup
+from .background import submit
+from .cache import bump_claims_version, bump_detail_epoch
+from .counting import count_claims
+
+logger = logging.getLogger(__name__)
+
+# pk-range width per UPDATE
+BULK_CHUNK = 5_000
+
+# finished jobs stay visible to a late poll for this long
+JOB_TIMEOUT = 60 * 60
+
+ACTIONS = {"flag": "Flag", "unflag": "Unflag", "status": "Set status"}
+
+def bulk_changes(action, status=""):
+    """Field values an action writes, or None for an unknown/incomplete action."""
+    if action == "flag":
+        return {"flagged": True}
+    if action == "unflag":
+        return {"flagged": False}
+    if action == "status" and status:
+        return {"status": status}
+    return None
+
+
+def _job_key(job_id):
+    return f"claims:bulk:{job_id}"
+
+
+def job_progress(job_id):
+    """The job's progress dict (see start_bulk), or None once expired/unknown."""
+    return cache.get(_job_key(job_id))
+
+
+def _save(job):
+    cache.set(_job_key(job["id"]), job, JOB_TIMEOUT)
+
+
+def start_bulk(qs, changes, list_qs=""):
+    """
+    Apply `changes` to every claim in `qs`. Sets that fit in one chunk (or any
+    set with CLAIMS_BULK_BACKGROUND off) run inline; larger ones run in the
+    background and report progress. Returns the job dict.
+    """
+    total = count_claims(qs)
+    job = {
+        "id": uuid.uuid4().hex, "total": total.n, "total_label": str(total), "updated": 0,
+        "percent": 0, "finished": False, "error": "", "list_qs": list_qs,
+    }
+    _save(job)
+    if (total.exact and total.n <= BULK_CHUNK) or not settings.CLAIMS_BULK_BACKGROUND:
+        run_bulk(job, qs, changes)
+    else:
+        # one job at a time: concurrent bulk UPDATEs would only fight over locks
+        submit("claim-bulk", run_bulk, job, qs, changes, workers=1)
+    return job
+
+
+def run_bulk(job, qs, changes):
+    now = timezone.now()
+    # rows that already hold the values are skipped, so re-runs write nothing
+    pending = qs.exclude(**changes)
+    try:
+        bounds = pending.aggregate(lo=Min("pk"), hi=Max("pk"))
+        lo, hi = bounds["lo"], bounds["hi"]
+        if lo is not None:
+            for start in range(lo, hi + 1, BULK_CHUNK):
+                chunk = pending.filter(pk__gte=start, pk__lt=start + BULK_CHUNK)
+                with transaction.atomic():
+                    # rollup deltas come from the rows as they are before the
+                    # UPDATE, locked first so no save can change them in between
+                    list(chunk.select_for_update().values_list("pk", flat=True))
+                    deltas = rollup.update_deltas(chunk, changes)
+                    job["updated"] += chunk.update(last_updated=now, **changes)
+                    rollup.apply_deltas(deltas)
+                job["percent"] = min(100, (start + BULK_CHUNK - lo) * 100 // (hi - lo + 1))
+                _save(job)
+    except Exception:
+        logger.exception("bulk claim update %s failed", job["id"])
+        job["error"] = "The update stopped early; claims changed so far keep their new values."
+    finally:
+        # update() sends no signals: invalidate the list and every detail card once
+        bump_claims_version()
+        bump_detail_epoch()
+        job.update(finished=True, percent=100 if not job["error"] else job["percent"])
+        _save(job)
+    return job
@@ -0,0 +1,125 @@
+"""
+Cache keys and version counters.
+
+Every write to a Claim bumps the global claims version (see signals.py), so
+anything derived from the claims table can be keyed or refreshed by comparing
+version numbers instead of re-querying. Rendered detail cards are keyed by a
+per-claim version, bumped by writes to that claim, its detail row or its notes,
+plus a detail epoch that bulk writers (importers) bump to drop them all.
+
+single_flight() caches expensive computations (the dashboard) with a TTL and a
+version, recomputing in one worker at a time while the others serve stale.
+
+The counters only invalidate across processes when the cache is shared
+(Redis via REDIS_URL): with the default per-process LocMemCache, a bump made by
+a management command never reaches the web workers (see is_shared()).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAIMS_VERSION_KEY = "claims:version"
+DETAIL_EPOCH_KEY = "claims:detail-epoch"
+
+# shown by importers (and `check --deploy`) when is_shared() is False
+PROCESS_LOCAL_WARNING = (
+    "The default cache is per process, so running web workers keep serving "
+    "fragments cached before this change until they expire or restart. "
+    "Set REDIS_URL to share cache versions between processes."
+)
+
+
+def is_shared():
+    """False for per-process backends, where version bumps stay in the bumping process."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    return not backend.endswith((".LocMemCache", ".DummyCache"))
+
+
+def _claim_version_key(pk):
+    return f"claims:claim-version:{pk}"
+
+
+def _seed(key):
+    # Seed from the clock so an evicted counter never goes back to a value
+    # that older cache entries were keyed with.
+    cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def _read(key):
+    v = cache.get(key)
+    if v is None:
+        _seed(key)
+        v = cache.get(key)
+    return v
+
+
+def _bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:  # key missing/evicted
+        _seed(key)
+        return cache.incr(key)
+
+
+def claims_version():
+    """Current global claims version (shared through the configured cache)."""
+    return _read(CLAIMS_VERSION_KEY)
+
+
+def bump_claims_version():
+    return _bump(CLAIMS_VERSION_KEY)
+
+
+def claim_version(pk):
+    """Version token for one claim's rendered detail: "<per-claim>.<epoch>"."""
+    key = _claim_version_key(pk)
+    found = cache.get_many([key, DETAIL_EPOCH_KEY])
+    if len(found) < 2:
+        return f"{_read(key)}.{_read(DETAIL_EPOCH_KEY)}"
+    return f"{found[key]}.{found[DETAIL_EPOCH_KEY]}"
+
+
+def invalidate_claim(pk):
+    return _bump(_claim_version_key(pk))
+
+
+def bump_detail_epoch():
+    return _bump(DETAIL_EPOCH_KEY)
+
+
+# stale entries stay around this long so there is always something to serve
+STALE_KEEP_SECONDS = 24 * 60 * 60
+
+
+def single_flight(key, compute, ttl, version=None, lock_timeout=30, wait=2.0):
+    """
+    compute() cached under `key`, fresh for `ttl` seconds and while `version`
+    is unchanged. Once stale, the caller that wins a cache.add() lock
+    recomputes and everyone else keeps serving the stale value meanwhile, so
+    an expiry never sends every worker into compute() at once. On a cold cache
+    the losers wait up to `wait` seconds for the winner before computing.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry["version"] == version and entry["fresh_until"] > now:
+        return entry["value"]
+
+    lock = f"{key}:lock"
+    if not cache.add(lock, 1, timeout=lock_timeout):
+        if entry is not None:
+            return entry["value"]
+        deadline = now + wait
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["value"]
+        return compute()
+    try:
+        value = compute()
+        cache.set(key, {"value": value, "version": version, "fresh_until": time.time() + ttl},
+                  STALE_KEEP_SECONDS)
+        return value
+    finally:
+        cache.delete(lock)
@@ -0,0 +1,15 @@
+from django.core import checks
+
+from .cache import PROCESS_LOCAL_WARNING, is_shared
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Versioned invalidation needs one cache shared by every process."""
+    if is_shared():
+        return []
+    return [checks.Warning(
+        "Claims cache versions are not shared between processes.",
+        hint=PROCESS_LOCAL_WARNING,
+        id="claims.W001",
+    )]
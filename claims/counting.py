@@ -0,0 +1,87 @@
+"""
+Result counting for large claim sets.
+
+Counts are exact up to EXACT_COUNT_THRESHOLD, using a COUNT over a LIMITed
+subquery so it stops early. Above that the number comes from the planner:
+pg_class.reltuples (unfiltered) or EXPLAIN's row estimate (filtered) on
+Postgres, and the maintained TableCounter on SQLite, where a filtered set
+is reported as a lower bound ("10,000+") rather than guessed.
+"""
+import json
+
+from django.db import connection
+from django.db.models import F
+
+from .models import Claim, TableCounter
+
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+class ResultCount:
+    __slots__ = ("n", "approximate", "lower_bound")
+
+    def __init__(self, n, approximate=False, lower_bound=False):
+        self.n, self.approximate, self.lower_bound = n, approximate, lower_bound
+
+    def __str__(self):
+        if self.lower_bound:
+            return f"{self.n:,}+"
+        return f"≈{self.n:,}" if self.approximate else f"{self.n:,}"
+
+    def __int__(self):
+        return self.n
+
+    @property
+    def exact(self):
+        return not (self.approximate or self.lower_bound)
+
+
+def count_claims(qs, threshold=None):
+    threshold = threshold or EXACT_COUNT_THRESHOLD
+    bounded = qs.order_by()[:threshold + 1].count()
+    if bounded <= threshold:
+        return ResultCount(bounded)
+    return estimate_count(qs, floor=threshold)
+
+
+def estimate_count(qs, floor):
+    unfiltered = not qs.query.where
+    if connection.vendor == "postgresql":
+        n = _pg_table_estimate(qs.model) if unfiltered else _pg_plan_estimate(qs)
+        if n is not None:
+            return ResultCount(max(n, floor), approximate=True)
+    elif unfiltered:
+        n = claim_row_count() if qs.model is Claim else None
+        if n is not None:
+            return ResultCount(max(n, floor), approximate=True)
+    return ResultCount(floor, lower_bound=True)
+
+
+def _pg_table_estimate(model):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed/analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+def _pg_plan_estimate(qs):
+    plan = json.loads(qs.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# ---------- maintained counter (SQLite and other backends without statistics) ----------
+def claim_row_count():
+    return TableCounter.objects.filter(table=Claim._meta.db_table).values_list("rows", flat=True).first()
+
+
+def adjust_claim_count(delta):
+    table = Claim._meta.db_table
+    if not TableCounter.objects.filter(table=table).update(rows=F("rows") + delta):
+        recount_claims()
+
+
+def recount_claims():
+    TableCounter.objects.update_or_create(
+        table=Claim._meta.db_table, defaults={"rows": Claim.objects.count()}
+    )
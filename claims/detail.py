@@ -0,0 +1,168 @@
+"""
+Claim detail fragments: render, cache, and warm ahead of the click.
+
+The card plus the first page of notes is rendered once per claim version (see
+cache.claim_version) and auth state, and cached together with the validators
+claim_detail needs, so a cached open touches neither the DB nor the template
+engine. Rows rendered into the table, and rows the pointer rests on, are warmed
+by a small background pool so the "View" click is usually a cache hit.
+"""
+import base64
+import logging
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .background import submit
+from .cache import claim_version
+from .models import Claim, ClaimDetail, ClaimNote
+
+logger = logging.getLogger(__name__)
+
+# notes rendered inline with the detail card, and per "Older notes" click
+NOTES_PAGE_SIZE = 20
+
+# Detail fragments are keyed by a per-claim version (bumped by claim, detail
+# and note writes), so the timeout only bounds memory.
+DETAIL_CACHE_TIMEOUT = 30 * 60
+
+# warm-ups queued beyond this are dropped; the click just renders cold
+MAX_PENDING = 200
+
+
+def detail_cache_key(pk, version, authenticated):
+    """Rendered card + first notes page, per claim version (cache.claim_version) and auth variant."""
+    return f"claims:detail:{pk}:{version}:{'auth' if authenticated else 'anon'}"
+
+
+def detail_claims():
+    """Claims with their detail row: one query for any number of pks."""
+    return Claim.objects.select_related("detail")
+
+
+def _claim_detail_obj(claim):
+    """The claim's ClaimDetail from select_related("detail"), or None."""
+    try:
+        return claim.detail
+    except ClaimDetail.DoesNotExist:
+        return None
+
+
+def detail_entry(claim, version, authenticated):
+    """(claim_id, validator stamp, claim version, html) for a claim from detail_claims()."""
+    if not hasattr(claim, "first_notes"):
+        prefetch_notes([claim])
+    notes = claim.first_notes
+    more = claim.note_count > len(notes)
+    html = render_to_string("includes/claim_detail_body.html", {
+        "claim": claim,
+        "detail": _claim_detail_obj(claim),
+        "notes": notes,
+        "older_url": older_notes_url(claim.pk, notes[-1]) if more else "",
+        "authenticated": authenticated,
+    })
+    return claim.claim_id, (claim.last_updated, claim.last_note_at), version, html
+
+
+def prefetch_notes(claims):
+    """First NOTES_PAGE_SIZE notes (with authors) of every claim, in one query."""
+    prefetch_related_objects(claims, Prefetch(
+        "notes",
+        queryset=ClaimNote.objects.select_related("author").order_by("-created_at", "-id")[:NOTES_PAGE_SIZE],
+        to_attr="first_notes",
+    ))
+
+
+def encode_note_cursor(note):
+    raw = f"{note.created_at.isoformat()}|{note.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_note_cursor(cursor):
+    """(created_at, pk) or None for a missing/garbled cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+def older_notes_url(claim_pk, last_note):
+    return f"{reverse('note-list', args=[claim_pk])}?before={encode_note_cursor(last_note)}"
+
+
+def older_notes(claim_pk, before=None):
+    """
+    A claim's notes, newest first, strictly older than the `before` cursor.
+    The `created_at <=` bound gives note_claim_created_idx a range start; the
+    OR alone is no index condition.
+    """
+    qs = ClaimNote.objects.filter(claim_id=claim_pk).select_related("author").order_by("-created_at", "-id")
+    after = decode_note_cursor(before)
+    if after:
+        created_at, pk = after
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk), created_at__lte=created_at)
+    return qs
+
+
+def notes_page(claim_pk, before=None, size=NOTES_PAGE_SIZE):
+    """
+    One page of older_notes(); seeks on note_claim_created_idx, so page N costs
+    the same as page 1. Returns (notes, url of the next older page or "").
+    """
+    notes = list(older_notes(claim_pk, before)[:size + 1])
+    older = older_notes_url(claim_pk, notes[size - 1]) if len(notes) > size else ""
+    return notes[:size], older
+
+
+# ---------- background warming ----------
+_pending = set()
+_lock = threading.Lock()
+
+
+def warm_details(pks, authenticated):
+    """
+    Queue detail fragments for `pks` to be rendered into the cache. Claims
+    already queued are skipped and the queue is bounded; with
+    CLAIMS_PREFETCH_WORKERS = 0 the work runs inline (tests).
+    """
+    with _lock:
+        room = MAX_PENDING - len(_pending)
+        todo = [pk for pk in dict.fromkeys(pks) if (pk, authenticated) not in _pending][:max(room, 0)]
+        _pending.update((pk, authenticated) for pk in todo)
+    if not todo:
+        return
+    if settings.CLAIMS_PREFETCH_WORKERS <= 0:
+        _warm(todo, authenticated)
+    else:
+        submit("claim-prefetch", _warm, todo, authenticated, workers=settings.CLAIMS_PREFETCH_WORKERS)
+
+
+def _warm(pks, authenticated):
+    try:
+        # keys are read before the rows, so a write racing with this render
+        # leaves its entry under a version nobody asks for
+        versions = {pk: claim_version(pk) for pk in pks}
+        keys = {pk: detail_cache_key(pk, v, authenticated) for pk, v in versions.items()}
+        cached = cache.get_many(keys.values())
+        missing = {pk: key for pk, key in keys.items() if key not in cached}
+        if missing:
+            claims = list(detail_claims().filter(pk__in=missing))
+            prefetch_notes(claims)
+            cache.set_many(
+                {missing[c.pk]: detail_entry(c, versions[c.pk], authenticated) for c in claims},
+                DETAIL_CACHE_TIMEOUT,
+            )
+    except Exception:
+        logger.exception("warming claim detail cache failed for %s", pks)
+    finally:
+        with _lock:
+            _pending.difference_update((pk, authenticated) for pk in pks)
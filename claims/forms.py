@@ -1,5 +1,9 @@
 from django import forms
+from django.db.models import F, Q
+
 from .models import Claim, ClaimNote
+from .paging import DEFAULT_SORT, SORTS
+from .trends import GRAINS
 
 class ClaimForm(forms.ModelForm):
     class Meta:
@@ -16,3 +20,129 @@ class NoteForm(forms.ModelForm):
                 "placeholder": "Add a note…"
             })
         }
+
+
+class ClaimFilterForm(forms.Form):
+    """
+    Query-string filter spec for claim_list. Each structured filter maps to a
+    sargable predicate that one of the indexes in Claim.Meta can serve; invalid
+    values are simply left out of the filter.
+    """
+    q = forms.CharField(required=False)
+    status = forms.CharField(required=False)
+    payer = forms.CharField(required=False)
+    billed_min = forms.DecimalField(required=False, min_value=0, decimal_places=2)
+    billed_max = forms.DecimalField(required=False, min_value=0, decimal_places=2)
+    paid_min = forms.DecimalField(required=False, min_value=0, decimal_places=2)
+    paid_max = forms.DecimalField(required=False, min_value=0, decimal_places=2)
+    service_from = forms.DateField(required=False)
+    service_to = forms.DateField(required=False)
+    flagged = forms.BooleanField(required=False)
+    underpaid = forms.BooleanField(required=False)
+    has_notes = forms.BooleanField(required=False)
+    sort = forms.ChoiceField(
+        required=False,
+        choices=[("", "")] + [(p + k, p + k) for k in SORTS for p in ("", "-")],
+    )
+
+    # cleaned field -> ORM lookup for the simple comparisons
+    LOOKUPS = {
+        "status": "status",
+        "payer": "payer",
+        "billed_min": "amount__gte",
+        "billed_max": "amount__lte",
+        "paid_min": "paid_amount__gte",
+        "paid_max": "paid_amount__lte",
+        "service_from": "service_date__gte",
+        "service_to": "service_date__lte",
+    }
+
+    def clean_q(self):
+        return " ".join(self.cleaned_data["q"].split())
+
+    def clean_status(self):
+        # statuses are stored title-cased (see the importers), so "?status=denied"
+        # keeps matching with a plain equality on the status indexes
+        return self.cleaned_data["status"].strip().title()
+
+    def clean_payer(self):
+        return self.cleaned_data["payer"].strip()
+
+    def clean_sort(self):
+        # the default ordering is left out so it shares cache keys with "no sort"
+        sort = self.cleaned_data["sort"]
+        return "" if sort == DEFAULT_SORT else sort
+
+    def clean(self):
+        data = super().clean()
+        for lo, hi in (("billed_min", "billed_max"), ("paid_min", "paid_max"), ("service_from", "service_to")):
+            if data.get(lo) is not None and data.get(hi) is not None and data[lo] > data[hi]:
+                self.add_error(hi, "Must not be lower than the minimum.")
+        return data
+
+    @property
+    def spec(self):
+        """Valid, non-empty filters only (errors are dropped rather than failing the page)."""
+        if not hasattr(self, "cleaned_data"):
+            self.is_valid()
+        return {k: v for k, v in self.cleaned_data.items() if v not in (None, "", False)}
+
+    def params(self, **extra):
+        """Normalized query-string params (for cache keys and pagination links)."""
+        out = {k: ("1" if v is True else str(v)) for k, v in self.spec.items()}
+        out.update(extra)  # an empty extra value drops that param
+        return {k: v for k, v in sorted(out.items()) if v}
+
+    def filter_queryset(self, qs):
+        """Apply the structured filters (everything except free-text `q` and `sort`)."""
+        spec = self.spec
+        qs = qs.filter(**{self.LOOKUPS[k]: v for k, v in spec.items() if k in self.LOOKUPS})
+        if spec.get("flagged"):
+            qs = qs.filter(flagged=True)
+        if spec.get("underpaid"):
+            # same predicate as the claim_underpaid_idx partial index
+            qs = qs.filter(Q(amount__gt=F("paid_amount")))
+        if spec.get("has_notes"):
+            # denormalized count (claim_has_notes_idx), no join to notes
+            qs = qs.filter(note_count__gt=0)
+        return qs
+
+
+class TrendsFilterForm(forms.Form):
+    """
+    Query-string spec for the trends view. `payer` may repeat (one series per
+    payer) and must be a known payer; invalid values are left out like in
+    ClaimFilterForm.
+    """
+    grain = forms.ChoiceField(required=False, choices=list(GRAINS.items()))
+    payer = forms.MultipleChoiceField(required=False)
+    status = forms.CharField(required=False)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    def __init__(self, *args, payers=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["payer"].choices = [(p, p) for p in payers]
+
+    def clean_status(self):
+        return self.cleaned_data["status"].strip().title()  # as in ClaimFilterForm
+
+    def clean(self):
+        data = super().clean()
+        if data.get("start") and data.get("end") and data["start"] > data["end"]:
+            self.add_error("end", "Must not be before the start.")
+        return data
+
+    @property
+    def spec(self):
+        """Keyword arguments for trends.series() from the valid fields."""
+        if not hasattr(self, "cleaned_data"):
+            self.is_valid()
+        data = self.cleaned_data
+        return {
+            "grain": data.get("grain") or "month",
+            "payers": tuple(data.get("payer") or ()),
+            "status": data.get("status", ""),
+            "start": data.get("start"),
+            "end": data.get("end"),
+        }
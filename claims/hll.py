@@ -0,0 +1,67 @@
+"""
+HyperLogLog distinct-count sketch.
+
+2**P one-byte registers (4 KB, ~1.6% standard error). Adding a value keeps,
+per register, the longest run of leading zeros seen among hashes routed to
+it; merging two sketches is a register-wise max, so the sketches stored per
+(payer, service month) combine into distinct counts for any set of payers
+and months. Adding is idempotent, but nothing can be taken out: a claim that
+is deleted or moved stays counted where it was until the next rebuild.
+NumPy, when installed, vectorizes merge() and count().
+"""
+import hashlib
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional: merges and counts fall back to pure Python
+    np = None
+
+P = 12
+M = 1 << P
+_ALPHA = 0.7213 / (1 + 1.079 / M)
+_INV_POW2 = [2.0 ** -r for r in range(64 - P + 2)]
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers else bytearray(M)
+
+    def add(self, value):
+        h = _hash(value)
+        index, rest = h >> (64 - P), h & ((1 << (64 - P)) - 1)
+        rank = (64 - P) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other):
+        if np is not None:
+            merged = np.maximum(np.frombuffer(self.registers, np.uint8), np.frombuffer(other.registers, np.uint8))
+            self.registers = bytearray(merged.tobytes())
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def _harmonic_sum(self):
+        if np is not None:
+            return float(np.ldexp(1.0, -np.frombuffer(self.registers, np.uint8).astype(np.int32)).sum())
+        return sum(_INV_POW2[r] for r in self.registers)
+
+    def count(self):
+        estimate = _ALPHA * M * M / self._harmonic_sum()
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * M and zeros:
+            estimate = M * math.log(M / zeros)  # linear counting for small sets
+        return round(estimate)
+
+    def __bytes__(self):
+        return bytes(self.registers)
@@ -0,0 +1,74 @@
+import gc
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+
+from claims.models import Claim
+from claims.rows import ROW_FIELDS, render_rows
+
+# the per-row markup claim_table.html used before rows were pre-rendered
+MODEL_ROWS_TEMPLATE = """{% for c in claims %}<tr id="claim-row-{{ c.pk }}" hx-get="{% url 'claim-prefetch' c.pk %}" hx-trigger="mouseenter once delay:150ms" hx-swap="none"><td>{{ c.claim_id }}{% if c.flagged %} <span class="badge">Flagged</span>{% endif %}{% if c.note_count %} <span class="muted">({{ c.note_count }} note{{ c.note_count|pluralize }})</span>{% endif %}</td><td>{{ c.patient_name }}</td><td>{{ c.payer }}</td><td>${{ c.amount }}</td><td>${{ c.paid_amount }}</td><td>{{ c.status }}</td><td>{{ c.service_date }}</td><td><button class="btn" hx-get="{% url 'claim-detail' c.pk %}" hx-target="#claim-table" hx-swap="outerHTML" hx-push-url="true">View</button></td></tr>{% endfor %}"""
+
+
+def synthetic_rows(n):
+    """ROW_FIELDS tuples shaped like the sample data (no DB needed)."""
+    payers = ["Aetna", "Blue Cross", "Cigna", "Self Funded Inc.", "United Healthcare"]
+    statuses = ["Denied", "Paid", "Pending", "Under Review", "Appealed"]
+    start, now = date(2021, 8, 1), datetime.now(timezone.utc)
+    return [
+        (
+            i, str(30000 + i), f"Patient <{i}> O'Hara", payers[i % 5],
+            Decimal(f"{1000 + i % 9000}.37"), Decimal(f"{i % 1000}.10"),
+            statuses[i % 5], start + timedelta(days=i % 700), now, i % 7 == 0, i % 4,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark claims table row rendering: model instances + template loop vs tuples + row formatter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+
+    def measure(self, build, render):
+        """(render seconds, peak bytes for rows + rendering, html); memory is traced in a separate run."""
+        gc.collect()
+        objs = build()
+        t0 = time.perf_counter()
+        html = render(objs)
+        elapsed = time.perf_counter() - t0
+        del objs
+        gc.collect()
+        tracemalloc.start()
+        render(build())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, html
+
+    def handle(self, *args, **opts):
+        template = engines["django"].from_string(MODEL_ROWS_TEMPLATE)
+        self.stdout.write(f"{'rows':>8}  {'strategy':<22} {'us/row':>8} {'peak MiB':>9} {'bytes/row':>10}")
+        for n in opts["rows"]:
+            tuples = synthetic_rows(n)
+            fields = ROW_FIELDS[1:]
+            results = {
+                "model+template": self.measure(
+                    lambda: [Claim(pk=t[0], **dict(zip(fields, t[1:]))) for t in tuples],
+                    lambda objs: template.render({"claims": objs}),
+                ),
+                "tuple+formatter": self.measure(
+                    lambda: [tuple(t) for t in tuples],
+                    render_rows,
+                ),
+            }
+            for name, (elapsed, peak, _) in results.items():
+                self.stdout.write(
+                    f"{n:>8}  {name:<22} {elapsed / n * 1e6:>8.2f} {peak / 2**20:>9.1f} {peak / n:>10.0f}"
+                )
+            same = results["model+template"][2] == results["tuple+formatter"][2]
+            self.stdout.write(f"{'':>8}  identical output: {same}")
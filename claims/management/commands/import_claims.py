@@ -1,6 +1,9 @@
 import csv
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from claims import rollup
+from claims.cache import PROCESS_LOCAL_WARNING, is_shared
 from claims.models import Claim
 
 DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d-%m-%Y")
@@ -25,7 +28,10 @@ class Command(BaseCommand):
     def handle(self, *args, **opts):
         path = opts["csv_path"]
         created = updated = 0
-        with open(path, newline="", encoding="utf-8-sig") as f:
+        # per-row upkeep (rollup, row counter, cache versions) is skipped during
+        # the load; one rebuild, recount and invalidation at the end. One
+        # transaction for the rows, not a commit per row.
+        with rollup.deferred(), transaction.atomic(), open(path, newline="", encoding="utf-8-sig") as f:
             reader = csv.DictReader(f)
             for row in reader:
                 # accept multiple header names
@@ -51,3 +57,5 @@ class Command(BaseCommand):
                 created += is_new
                 updated += (not is_new)
         self.stdout.write(self.style.SUCCESS(f"Done. Created: {created}, Updated: {updated}"))
+        if not is_shared():
+            self.stdout.write(self.style.WARNING(PROCESS_LOCAL_WARNING))
@@ -1,4 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from claims import rollup
+from claims.cache import PROCESS_LOCAL_WARNING, is_shared
 from claims.models import Claim, ClaimDetail
 
 from pathlib import Path
@@ -120,77 +123,83 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("Dry-run: stopping before DB writes."))
             return
 
-        if mode == "overwrite":
-            self.stdout.write(self.style.WARNING("Overwrite mode: clearing tables…"))
-            ClaimDetail.objects.all().delete()
-            Claim.objects.all().delete()
-
-        created, updated, linked = 0, 0, 0
-
-        # --- import main claims ---
-        for r in list_rows:
-            # use normalized keys
-            claim_id = pick(r, "claimid", "id", "claimid", "claim", default="")
-            # tolerate weird variants (e.g., "claim_id" -> "claimid"; already normalized)
-            if not claim_id:
-                continue
-
-            patient = pick(r, "patientname", "patient", "fullname")
-            payer   = pick(r, "payer", "insurername", "insurer")
-            billed  = to_dec(pick(r, "amount", "billedamount", "billed"))
-            paid    = to_dec(pick(r, "paidamount", "paid"))
-            status  = pick(r, "status")
-            service = to_date(pick(r, "servicedate", "dischargedate", "dischargedon"))
-
-            obj, was_created = Claim.objects.get_or_create(
-                claim_id=str(claim_id),
-                defaults={
-                    "patient_name": patient,
-                    "payer": payer,
-                    "amount": billed,
-                    "paid_amount": paid,
-                    "status": status,
-                    "service_date": service,
-                },
-            )
-            if was_created:
-                created += 1
-            else:
-                changed = False
-                for field, val in {
-                    "patient_name": patient,
-                    "payer": payer,
-                    "amount": billed,
-                    "paid_amount": paid,
-                    "status": status,
-                    "service_date": service,
-                }.items():
-                    if getattr(obj, field) != val:
-                        setattr(obj, field, val)
-                        changed = True
-                if changed:
-                    obj.save()
-                    updated += 1
-
-        # --- import details (optional) ---
-        if detail_rows:
-            claims_by_id = {c.claim_id: c for c in Claim.objects.all().only("id", "claim_id")}
-            for r in detail_rows:
-                cid = pick(r, "claimid", "id")
-                if not cid or cid not in claims_by_id:
+        # per-row upkeep (rollup, row counter, cache versions) is skipped during
+        # the load; one rebuild, recount and invalidation at the end. One
+        # transaction for the rows, not a commit per row.
+        with rollup.deferred(), transaction.atomic():
+            if mode == "overwrite":
+                self.stdout.write(self.style.WARNING("Overwrite mode: clearing tables…"))
+                ClaimDetail.objects.all().delete()
+                Claim.objects.all().delete()
+
+            created, updated, linked = 0, 0, 0
+
+            # --- import main claims ---
+            for r in list_rows:
+                # use normalized keys
+                claim_id = pick(r, "claimid", "id", "claimid", "claim", default="")
+                # tolerate weird variants (e.g., "claim_id" -> "claimid"; already normalized)
+                if not claim_id:
                     continue
-                claim = claims_by_id[cid]
-                cpt   = pick(r, "cptcodes", "cpt")
-                if isinstance(cpt, list):
-                    cpt = ",".join([str(x) for x in cpt])
-                denial = pick(r, "denialreason", "reason")
-
-                ClaimDetail.objects.update_or_create(
-                    claim=claim,
-                    defaults={"cpt_codes": cpt, "denial_reason": denial},
+
+                patient = pick(r, "patientname", "patient", "fullname")
+                payer   = pick(r, "payer", "insurername", "insurer")
+                billed  = to_dec(pick(r, "amount", "billedamount", "billed"))
+                paid    = to_dec(pick(r, "paidamount", "paid"))
+                status  = str(pick(r, "status")).strip().title()
+                service = to_date(pick(r, "servicedate", "dischargedate", "dischargedon"))
+
+                obj, was_created = Claim.objects.get_or_create(
+                    claim_id=str(claim_id),
+                    defaults={
+                        "patient_name": patient,
+                        "payer": payer,
+                        "amount": billed,
+                        "paid_amount": paid,
+                        "status": status,
+                        "service_date": service,
+                    },
                 )
-                linked += 1
+                if was_created:
+                    created += 1
+                else:
+                    changed = False
+                    for field, val in {
+                        "patient_name": patient,
+                        "payer": payer,
+                        "amount": billed,
+                        "paid_amount": paid,
+                        "status": status,
+                        "service_date": service,
+                    }.items():
+                        if getattr(obj, field) != val:
+                            setattr(obj, field, val)
+                            changed = True
+                    if changed:
+                        obj.save()
+                        updated += 1
+
+            # --- import details (optional) ---
+            if detail_rows:
+                claims_by_id = {c.claim_id: c for c in Claim.objects.all().only("id", "claim_id")}
+                for r in detail_rows:
+                    cid = pick(r, "claimid", "id")
+                    if not cid or cid not in claims_by_id:
+                        continue
+                    claim = claims_by_id[cid]
+                    cpt   = pick(r, "cptcodes", "cpt")
+                    if isinstance(cpt, list):
+                        cpt = ",".join([str(x) for x in cpt])
+                    denial = pick(r, "denialreason", "reason")
+
+                    ClaimDetail.objects.update_or_create(
+                        claim=claim,
+                        defaults={"cpt_codes": cpt, "denial_reason": denial},
+                    )
+                    linked += 1
 
         self.stdout.write(self.style.SUCCESS(
             f"Imported claims → created: {created}, updated: {updated}; details linked: {linked}"
         ))
+        if not is_shared():
+            self.stdout.write(self.style.WARNING(PROCESS_LOCAL_WARNING))
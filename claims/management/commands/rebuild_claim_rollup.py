@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from claims import rollup
+from claims.models import ClaimRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard rollup (ClaimRollup, UnderpaymentBin, DistinctSketch) from the claims table."
+
+    def handle(self, *args, **opts):
+        rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {ClaimRollup.objects.count()} rollup buckets."))
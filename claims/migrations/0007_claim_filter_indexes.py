@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.db.models.functions import Trim
+
+
+def trim_statuses(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    # status is now filtered by plain (indexable) equality, so store it trimmed
+    Claim.objects.exclude(status=Trim('status')).update(status=Trim('status'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0006_alter_claim_claim_id_alter_claim_flagged_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(trim_statuses, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['payer', 'status', 'last_updated'], name='claim_payer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['payer', 'service_date'], name='claim_payer_svcdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['status', 'service_date'], name='claim_status_svcdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['amount'], name='claim_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['paid_amount'], name='claim_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(condition=models.Q(('flagged', True)), fields=['last_updated'], name='claim_flagged_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(condition=models.Q(('amount__gt', models.F('paid_amount'))), fields=['last_updated'], name='claim_underpaid_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:15
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0007_claim_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='claim',
+            name='claim_amount_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='claim',
+            name='claim_paid_idx',
+        ),
+        migrations.AddField(
+            model_name='claim',
+            name='underpayment',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.F('amount'), '-', models.F('paid_amount')), 2), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['last_updated', 'id'], name='claim_lastupd_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['amount', 'id'], name='claim_amount_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['paid_amount', 'id'], name='claim_paid_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['underpayment', 'id'], name='claim_underpay_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['service_date', 'id'], name='claim_svcdate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['payer', 'id'], name='claim_payer_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['patient_name', 'id'], name='claim_patient_id_idx'),
+        ),
+    ]
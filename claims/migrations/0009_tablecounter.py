@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+def seed_claim_count(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    TableCounter = apps.get_model('claims', 'TableCounter')
+    TableCounter.objects.create(table=Claim._meta.db_table, rows=Claim.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0008_claim_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=64, unique=True)),
+                ('rows', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_claim_count, migrations.RunPython.noop),
+    ]
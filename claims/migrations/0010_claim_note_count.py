@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_note_stats(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    ClaimNote = apps.get_model('claims', 'ClaimNote')
+    notes = ClaimNote.objects.filter(claim=OuterRef('pk')).order_by().values('claim')
+    Claim.objects.filter(pk__in=ClaimNote.objects.values('claim')).update(
+        note_count=Coalesce(Subquery(notes.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), 0),
+        last_note_at=Subquery(notes.annotate(last=Max('created_at')).values('last')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0009_tablecounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='last_note_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='claim',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(condition=models.Q(('note_count__gt', 0)), fields=['last_updated'], name='claim_has_notes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimnote',
+            index=models.Index(fields=['claim', 'created_at', 'id'], name='note_claim_created_idx'),
+        ),
+        migrations.RunPython(backfill_note_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:32
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollup(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    ClaimRollup = apps.get_model('claims', 'ClaimRollup')
+    under = Q(amount__gt=F('paid_amount'))
+    rows = (
+        Claim.objects.order_by()
+        .annotate(month=TruncMonth('service_date'))
+        .values('payer', 'status', 'month')
+        .annotate(
+            n_claims=Count('pk'), n_billed=Sum('amount'), n_paid=Sum('paid_amount'),
+            n_underpaid=Count('pk', filter=under), n_underpayment=Sum('underpayment', filter=under),
+            n_flagged=Count('pk', filter=Q(flagged=True)),
+        )
+    )
+    ClaimRollup.objects.bulk_create((
+        ClaimRollup(
+            payer=r['payer'], status=r['status'], month=r['month'], claims=r['n_claims'],
+            billed=r['n_billed'] or 0, paid=r['n_paid'] or 0, underpaid=r['n_underpaid'],
+            underpayment=r['n_underpayment'] or 0, flagged=r['n_flagged'],
+        )
+        for r in rows
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0010_claim_note_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payer', models.CharField(max_length=128)),
+                ('status', models.CharField(max_length=32)),
+                ('month', models.DateField()),
+                ('claims', models.BigIntegerField(default=0)),
+                ('billed', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('underpaid', models.BigIntegerField(default=0)),
+                ('underpayment', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('flagged', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('payer', 'status', 'month'), name='rollup_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:43
+
+from collections import Counter
+
+from django.db import migrations, models
+
+from claims.sketch import bin_index
+
+
+def build_bins(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    UnderpaymentBin = apps.get_model('claims', 'UnderpaymentBin')
+    bins = Counter()
+    rows = Claim.objects.order_by().values_list('payer', 'service_date', 'underpayment').iterator(chunk_size=5000)
+    for payer, service_date, underpayment in rows:
+        bins[payer, service_date.replace(day=1), bin_index(underpayment)] += 1
+    UnderpaymentBin.objects.bulk_create((
+        UnderpaymentBin(payer=payer, month=month, bin=b, claims=n)
+        for (payer, month, b), n in bins.items()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0011_claimrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnderpaymentBin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payer', models.CharField(max_length=128)),
+                ('month', models.DateField()),
+                ('bin', models.SmallIntegerField()),
+                ('claims', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('payer', 'month', 'bin'), name='underpayment_bin_uniq')],
+            },
+        ),
+        migrations.RunPython(build_bins, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:45
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from claims.hll import HyperLogLog
+
+
+def build_sketches(apps, schema_editor):
+    Claim = apps.get_model('claims', 'Claim')
+    DistinctSketch = apps.get_model('claims', 'DistinctSketch')
+    sketches = defaultdict(lambda: (HyperLogLog(), HyperLogLog()))
+    rows = (
+        Claim.objects.order_by().values_list('payer', 'service_date', 'patient_name', 'detail__cpt_codes')
+        .iterator(chunk_size=5000)
+    )
+    for payer, service_date, patient, cpt_codes in rows:
+        patients, codes = sketches[payer, service_date.replace(day=1)]
+        patients.add(patient)
+        codes.update(c.strip() for c in (cpt_codes or '').replace(';', ',').split(',') if c.strip())
+    DistinctSketch.objects.bulk_create((
+        DistinctSketch(payer=payer, month=month, patients=bytes(patients), cpt_codes=bytes(codes))
+        for (payer, month), (patients, codes) in sketches.items()
+    ), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0012_underpaymentbin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistinctSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payer', models.CharField(max_length=128)),
+                ('month', models.DateField()),
+                ('patients', models.BinaryField()),
+                ('cpt_codes', models.BinaryField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('payer', 'month'), name='distinct_sketch_uniq')],
+            },
+        ),
+        migrations.RunPython(build_sketches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0013_distinctsketch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='claim',
+            name='last_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='claim',
+            name='patient_name',
+            field=models.CharField(max_length=128),
+        ),
+        migrations.AlterField(
+            model_name='claim',
+            name='payer',
+            field=models.CharField(max_length=128),
+        ),
+        migrations.AlterField(
+            model_name='claim',
+            name='service_date',
+            field=models.DateField(),
+        ),
+    ]
@@ -1,28 +1,73 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Round
 from django.conf import settings 
 
 class Claim(models.Model):
     claim_id = models.CharField(max_length=32, db_index=True)
-    patient_name= models.CharField(max_length=128, db_index=True)
-    payer= models.CharField(max_length=128, db_index=True)
+    # patient_name, payer, service_date and last_updated are indexed through
+    # the (column, id) sort indexes below, which also serve single-column lookups
+    patient_name= models.CharField(max_length=128)
+    payer= models.CharField(max_length=128)
     amount= models.DecimalField(max_digits=12, decimal_places=2)
     paid_amount= models.DecimalField(max_digits=12, decimal_places=2)
     status= models.CharField(max_length=32, db_index=True)
-    service_date= models.DateField(db_index=True)
-    last_updated= models.DateTimeField(auto_now=True, db_index=True)
+    service_date= models.DateField()
+    last_updated= models.DateTimeField(auto_now=True)
     flagged= models.BooleanField(default=False, db_index=True)
+    # stored (not virtual) so it can carry a plain (underpayment, id) sort index;
+    # rounded so SQLite's float arithmetic compares equal to the 2dp cursor value
+    underpayment = models.GeneratedField(
+        expression=Round(F("amount") - F("paid_amount"), 2),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
+    )
+    # maintained on note writes (see signals.py) so the list never joins notes
+    note_count = models.PositiveIntegerField(default=0)
+    last_note_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
             # speeds up typical filters/sorts; keep order asc for portability
             models.Index(fields=['status', 'last_updated'], name='claim_status_lastupd_idx'),
             models.Index(fields=['flagged', 'last_updated'], name='claim_flag_lastupd_idx'),
+            # structured list filters (ClaimFilterForm): equality columns first, range last
+            models.Index(fields=['payer', 'status', 'last_updated'], name='claim_payer_status_idx'),
+            models.Index(fields=['payer', 'service_date'], name='claim_payer_svcdate_idx'),
+            models.Index(fields=['status', 'service_date'], name='claim_status_svcdate_idx'),
+            # sortable columns (claims.paging.SORTS), each tie-broken by id for keyset paging;
+            # amount/paid_amount double as the range-filter indexes
+            models.Index(fields=['last_updated', 'id'], name='claim_lastupd_id_idx'),
+            models.Index(fields=['amount', 'id'], name='claim_amount_id_idx'),
+            models.Index(fields=['paid_amount', 'id'], name='claim_paid_id_idx'),
+            models.Index(fields=['underpayment', 'id'], name='claim_underpay_id_idx'),
+            models.Index(fields=['service_date', 'id'], name='claim_svcdate_id_idx'),
+            models.Index(fields=['payer', 'id'], name='claim_payer_id_idx'),
+            models.Index(fields=['patient_name', 'id'], name='claim_patient_id_idx'),
+            # flagged-only / underpaid-only views touch a small slice of the table
+            models.Index(fields=['last_updated'], condition=Q(flagged=True), name='claim_flagged_idx'),
+            models.Index(fields=['last_updated'], condition=Q(amount__gt=F('paid_amount')),
+                         name='claim_underpaid_idx'),
+            # "has notes" filter
+            models.Index(fields=['last_updated'], condition=Q(note_count__gt=0), name='claim_has_notes_idx'),
         ]
 
     def __str__(self):
         return f"{self.claim_id} — {self.patient_name}"
+
+    def save(self, *args, **kwargs):
+        # the rollup signals lock and read the stored row (pre_save) and apply
+        # the deltas (post_save); one transaction makes concurrent writers to
+        # this claim take their old values in turn
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     
+def split_cpt_codes(text):
+    """CPT codes from a "99204,82947;99406" style list."""
+    return [c.strip() for c in (text or "").replace(";", ",").split(",") if c.strip()]
+
+
 class ClaimDetail(models.Model):
     # One-to-one with the main claim
     claim = models.OneToOneField(Claim, on_delete=models.CASCADE, related_name="detail")
@@ -30,7 +75,7 @@ class ClaimDetail(models.Model):
     denial_reason = models.TextField(blank=True)
 
     def cpt_list(self):
-        return [c.strip() for c in self.cpt_codes.replace(";", ",").split(",") if c.strip()]
+        return split_cpt_codes(self.cpt_codes)
 
 
 class ClaimNote(models.Model):
@@ -43,9 +88,74 @@ class ClaimNote(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pages of one claim's notes, newest first
+            models.Index(fields=["claim", "created_at", "id"], name="note_claim_created_idx"),
+        ]
 
     def __str__(self):
         who = self.author or "Anonymous"
         return f"Note on {self.claim.claim_id} by {who} @ {self.created_at:%Y-%m-%d %H:%M}"
-    
-    
+
+
+class TableCounter(models.Model):
+    """Row count per table, kept current on write (see signals.py) so "N results"
+    for an unfiltered list never needs COUNT(*) on backends without statistics."""
+    table = models.CharField(max_length=64, unique=True)
+    rows = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.table}: {self.rows}"
+
+
+class ClaimRollup(models.Model):
+    """Per (payer, status, service month) totals, kept current on every claim
+    write (see claims/rollup.py) so the dashboard never aggregates Claim."""
+    payer = models.CharField(max_length=128)
+    status = models.CharField(max_length=32)
+    month = models.DateField()  # first day of the service month
+    claims = models.BigIntegerField(default=0)
+    billed = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # claims with amount > paid_amount, and the sum of their shortfall
+    underpaid = models.BigIntegerField(default=0)
+    underpayment = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    flagged = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["payer", "status", "month"], name="rollup_bucket_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.payer} / {self.status} / {self.month:%Y-%m}: {self.claims}"
+
+
+class UnderpaymentBin(models.Model):
+    """Per (payer, service month) counts of (amount - paid_amount) in log
+    bins (see claims/sketch.py); summing a payer's or month's rows merges
+    their sketches."""
+    payer = models.CharField(max_length=128)
+    month = models.DateField()
+    bin = models.SmallIntegerField()
+    claims = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["payer", "month", "bin"], name="underpayment_bin_uniq"),
+        ]
+
+
+class DistinctSketch(models.Model):
+    """Per (payer, service month) HyperLogLog registers of patient names and
+    CPT codes (see claims/hll.py); merging rows gives approximate distinct
+    counts for any set of payers and months."""
+    payer = models.CharField(max_length=128)
+    month = models.DateField()
+    patients = models.BinaryField()
+    cpt_codes = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["payer", "month"], name="distinct_sketch_uniq"),
+        ]
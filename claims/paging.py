@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination and index-backed sorting for the claims table.
+
+Pages are fetched with a seek on the ordering columns instead of OFFSET, so page
+N costs the same as page 1. Every sortable column is tie-broken by `id` and has
+a matching (column, id) index in Claim.Meta, so both the ORDER BY and the seek
+stay index-only. The cursor is an opaque, URL-safe encoding of the sort key and
+the last row's (value, id).
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+from .rows import AMOUNT, LAST_UPDATED, PAID, PATIENT, PAYER, PK, ROW_FIELDS, SERVICE_DATE
+
+PAGE_SIZE = 50
+
+# sort key -> (order column, value from a ROW_FIELDS tuple, cursor value parser)
+SORTS = {
+    "updated": ("last_updated", lambda r: r[LAST_UPDATED], datetime.fromisoformat),
+    "billed": ("amount", lambda r: r[AMOUNT], Decimal),
+    "paid": ("paid_amount", lambda r: r[PAID], Decimal),
+    "underpayment": ("underpayment", lambda r: r[AMOUNT] - r[PAID], Decimal),
+    "service_date": ("service_date", lambda r: r[SERVICE_DATE], date.fromisoformat),
+    "payer": ("payer", lambda r: r[PAYER], str),
+    "patient": ("patient_name", lambda r: r[PATIENT], str),
+}
+DEFAULT_SORT = "-updated"
+
+
+def parse_sort(sort):
+    """'-billed' -> ('billed', True); unknown keys fall back to DEFAULT_SORT."""
+    sort = sort or DEFAULT_SORT
+    key, desc = sort.lstrip("-"), sort.startswith("-")
+    if key not in SORTS:
+        return parse_sort(DEFAULT_SORT)
+    return key, desc
+
+
+def encode_cursor(row, sort=DEFAULT_SORT):
+    key, _ = parse_sort(sort)
+    value = SORTS[key][1](row)
+    value = value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+    raw = json.dumps([key, value, row[PK]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort=DEFAULT_SORT):
+    """Return (value, pk) or None for a missing/garbled cursor or one from another sort."""
+    if not cursor:
+        return None
+    key, _ = parse_sort(sort)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_key, value, pk = json.loads(raw)
+        if cursor_key != key:
+            return None
+        return SORTS[key][2](value), int(pk)
+    except (ValueError, TypeError, ArithmeticError):
+        return None
+
+
+def sorted_claims(qs, sort=DEFAULT_SORT):
+    """`qs` ordered by `sort` with the `id` tie-break (plus the lookup column name)."""
+    key, desc = parse_sort(sort)
+    column = SORTS[key][0]
+    order = (f"-{column}", "-pk") if desc else (column, "pk")
+    return qs.order_by(*order), column, desc
+
+
+def _seek(qs, column, value, pk, op):
+    """
+    Rows strictly after (value, pk) in the direction of `op` ("gt"/"lt"). The
+    OR alone is no index condition, so a plain `column >= value` (or <=) comes
+    first to give the (column, id) index a range start.
+    """
+    bound = Q(**{f"{column}__{op}e": value})
+    return qs.filter(bound, Q(**{f"{column}__{op}": value}) | Q(**{column: value, f"pk__{op}": pk}))
+
+
+def keyset_page(qs, cursor, sort=DEFAULT_SORT, size=PAGE_SIZE):
+    """
+    One page of `qs` in `sort` order as ROW_FIELDS tuples, plus the cursor for
+    the next page (or None).
+    """
+    qs, column, desc = sorted_claims(qs, sort)
+    after = decode_cursor(cursor, sort)
+    if after:
+        value, pk = after
+        qs = _seek(qs, column, value, pk, "lt" if desc else "gt")
+    rows = list(qs.values_list(*ROW_FIELDS)[:size + 1])
+    next_cursor = encode_cursor(rows[size - 1], sort) if len(rows) > size else None
+    return rows[:size], next_cursor
+
+
+def neighbour_seeks(qs, row, sort=DEFAULT_SORT):
+    """(preceding, following) querysets around a ROW_FIELDS tuple, nearest row first."""
+    qs, column, desc = sorted_claims(qs, sort)
+    value = SORTS[parse_sort(sort)[0]][1](row)
+    forward, backward = ("lt", "gt") if desc else ("gt", "lt")
+    return (
+        _seek(qs.reverse(), column, value, row[PK], backward).values_list("pk", flat=True),
+        _seek(qs, column, value, row[PK], forward).values_list("pk", flat=True),
+    )
+
+
+def neighbours(qs, row, sort=DEFAULT_SORT):
+    """
+    (previous pk, next pk) around a ROW_FIELDS tuple in `qs` ordered by `sort`:
+    one single-row seek each way, each a range scan starting at the row on the
+    same (column, id) index the list pages with. The row itself need not be in
+    `qs` (e.g. it no longer matches).
+    """
+    preceding, following = neighbour_seeks(qs, row, sort)
+    return preceding.first(), following.first()
@@ -0,0 +1,378 @@
+"""
+Incrementally maintained dashboard totals (ClaimRollup, UnderpaymentBin,
+DistinctSketch).
+
+Every claim counts towards exactly one (payer, status, service month) bucket,
+its underpayment towards one log bin of its (payer, month) sketch, and its
+patient and CPT codes towards that month's HyperLogLog sketches.
+A write applies the difference between the claim's old and new contribution as
+F() increments: saves and deletes through signals.py, queryset update() paths
+(flag toggle, bulk actions) through apply_deltas(). Importers suspend per-row
+maintenance with deferred() and rebuild once at the end.
+"""
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .cache import bump_claims_version, bump_detail_epoch
+from .counting import recount_claims
+from .hll import HyperLogLog
+from .models import Claim, ClaimDetail, ClaimRollup, DistinctSketch, UnderpaymentBin, split_cpt_codes
+from .sketch import LogSketch, bin_index
+
+# Claim fields a bucket depends on, in contribution() argument order
+SOURCE_FIELDS = ("payer", "status", "service_date", "amount", "paid_amount", "flagged")
+MEASURES = ("claims", "billed", "paid", "underpaid", "underpayment", "flagged")
+
+_local = threading.local()
+
+
+def maintained():
+    """False inside deferred() (on this thread)."""
+    return not getattr(_local, "deferred", False)
+
+
+@contextmanager
+def deferred():
+    """
+    Skip per-row maintenance for bulk loads in the block (rollup, sketches,
+    the claim row counter and cache invalidation, see signals.py); rebuild,
+    recount and invalidate everything once after it.
+    """
+    _local.deferred = True
+    try:
+        yield
+    finally:
+        _local.deferred = False
+        rebuild()
+        recount_claims()
+        bump_claims_version()
+        bump_detail_epoch()  # every cached detail card
+
+
+def _money(v):
+    return v if isinstance(v, Decimal) else Decimal(str(v or 0))
+
+
+def source_values(claim):
+    """
+    SOURCE_FIELDS of an instance converted as the DB would store them: a claim
+    saved with service_date="2022-01-05" keeps the string until reloaded.
+    """
+    return tuple(Claim._meta.get_field(f).to_python(getattr(claim, f)) for f in SOURCE_FIELDS)
+
+
+def contribution(payer, status, service_date, amount, paid_amount, flagged):
+    """(bucket key, measures) one claim adds to the rollup."""
+    amount, paid_amount = _money(amount), _money(paid_amount)
+    under = amount > paid_amount
+    return (payer, status, service_date.replace(day=1)), {
+        "claims": 1,
+        "billed": amount,
+        "paid": paid_amount,
+        "underpaid": int(under),
+        "underpayment": amount - paid_amount if under else Decimal(0),
+        "flagged": int(bool(flagged)),
+        "bins": {bin_index(amount - paid_amount): 1},
+    }
+
+
+def new_deltas():
+    return defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+
+
+def add(deltas, key, measures, sign=1):
+    bucket = deltas[key]
+    for m, v in measures.items():
+        if m == "bins":
+            bins = bucket.setdefault("bins", Counter())
+            for b, n in v.items():
+                bins[b] += sign * n
+        else:
+            bucket[m] += sign * v
+
+
+def claim_deltas(old, new):
+    """Deltas for one claim going from `old` to `new` SOURCE_FIELDS values (either may be None)."""
+    deltas = new_deltas()
+    if old:
+        add(deltas, *contribution(*old), sign=-1)
+    if new:
+        add(deltas, *contribution(*new))
+    return deltas
+
+
+def _increment(model, key, changes):
+    """F() increments on the `key` row of `model`, creating it when missing."""
+    row = model.objects.filter(**key)
+    increments = {m: F(m) + v for m, v in changes.items()}
+    if row.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **changes)
+    except IntegrityError:  # another writer created it first
+        row.update(**increments)
+
+
+def apply_deltas(deltas):
+    """Increment each bucket (and its underpayment bins) by its deltas, creating missing rows."""
+    bins = Counter()
+    for (payer, status, month), measures in deltas.items():
+        for b, n in measures.get("bins", {}).items():
+            bins[payer, month, b] += n
+        changes = {m: measures[m] for m in MEASURES if measures[m]}
+        if changes:
+            _increment(ClaimRollup, {"payer": payer, "status": status, "month": month}, changes)
+    for (payer, month, b), n in bins.items():
+        if n:
+            _increment(UnderpaymentBin, {"payer": payer, "month": month, "bin": b}, {"claims": n})
+
+
+def bucket_totals(qs):
+    """One grouped query: rollup rows (as dicts keyed by MEASURES) for the claims in `qs`."""
+    under = Q(amount__gt=F("paid_amount"))
+    rows = (
+        qs.order_by()
+          .annotate(month=TruncMonth("service_date"))
+          .values("payer", "status", "month")
+          .annotate(
+              n_claims=Count("pk"), n_billed=Sum("amount"), n_paid=Sum("paid_amount"),
+              n_underpaid=Count("pk", filter=under), n_underpayment=Sum("underpayment", filter=under),
+              n_flagged=Count("pk", filter=Q(flagged=True)),
+          )
+    )
+    for row in rows:
+        yield (row["payer"], row["status"], row["month"]), {m: row[f"n_{m}"] or 0 for m in MEASURES}
+
+
+def update_deltas(qs, changes):
+    """
+    Deltas for `qs.update(**changes)` (status and/or flagged), from one grouped
+    query over the rows BEFORE the update; run both in the same transaction.
+    """
+    deltas = new_deltas()
+    for (payer, status, month), measures in bucket_totals(qs):
+        add(deltas, (payer, status, month), measures, sign=-1)
+        if "flagged" in changes:
+            measures = dict(measures, flagged=measures["claims"] if changes["flagged"] else 0)
+        add(deltas, (payer, changes.get("status", status), month), measures)
+    return deltas
+
+
+def flag_toggled(claim):
+    """Deltas for a claim whose `flagged` was just flipped to its current value."""
+    key, _ = contribution(*source_values(claim))
+    deltas = new_deltas()
+    deltas[key]["flagged"] = 1 if claim.flagged else -1
+    return deltas
+
+
+def underpayment_bins(qs):
+    """Counter of (payer, month, bin) over the claims in `qs`, streamed."""
+    bins = Counter()
+    rows = qs.order_by().values_list("payer", "service_date", "underpayment").iterator(chunk_size=5000)
+    for payer, service_date, underpayment in rows:
+        bins[payer, service_date.replace(day=1), bin_index(underpayment)] += 1
+    return bins
+
+
+def distinct_sketches(qs):
+    """{(payer, month): (patients HLL, CPT codes HLL)} over the claims in `qs`, streamed."""
+    sketches = defaultdict(lambda: (HyperLogLog(), HyperLogLog()))
+    rows = (
+        qs.order_by().values_list("payer", "service_date", "patient_name", "detail__cpt_codes")
+        .iterator(chunk_size=5000)
+    )
+    for payer, service_date, patient, cpt_codes in rows:
+        patients, codes = sketches[payer, service_date.replace(day=1)]
+        patients.add(patient)
+        codes.update(split_cpt_codes(cpt_codes))
+    return sketches
+
+
+def add_distinct(payer, month, patients=(), cpt_codes=()):
+    """Add values to the (payer, month) sketches; a read-modify-write under a row lock."""
+    if not patients and not cpt_codes:
+        return
+    with transaction.atomic():
+        row = DistinctSketch.objects.select_for_update().filter(payer=payer, month=month).first()
+        if row is None:
+            try:
+                with transaction.atomic():
+                    row = DistinctSketch.objects.create(
+                        payer=payer, month=month, patients=bytes(HyperLogLog()), cpt_codes=bytes(HyperLogLog()),
+                    )
+            except IntegrityError:  # another writer created it first
+                row = DistinctSketch.objects.select_for_update().get(payer=payer, month=month)
+        row.patients = bytes(HyperLogLog(row.patients).update(patients))
+        row.cpt_codes = bytes(HyperLogLog(row.cpt_codes).update(cpt_codes))
+        row.save(update_fields=["patients", "cpt_codes"])
+
+
+def claim_distinct(pk, payer, month, patient, moved):
+    """
+    Sketch updates for a claim saved into (payer, service month): its patient
+    always (adding is idempotent), its CPT codes only when it `moved` to
+    another payer/month (detail saves add them otherwise).
+    """
+    cpt_codes = ()
+    if moved:
+        cpt_codes = split_cpt_codes(
+            ClaimDetail.objects.filter(claim_id=pk).values_list("cpt_codes", flat=True).first()
+        )
+    add_distinct(payer, month, [patient], cpt_codes)
+
+
+def rebuild():
+    """Recompute every bucket, bin and sketch from Claim (importers, `manage.py rebuild_claim_rollup`)."""
+    with transaction.atomic():
+        ClaimRollup.objects.all().delete()
+        ClaimRollup.objects.bulk_create(
+            (
+                ClaimRollup(payer=payer, status=status, month=month, **measures)
+                for (payer, status, month), measures in bucket_totals(Claim.objects.all())
+            ),
+            batch_size=1000,
+        )
+        UnderpaymentBin.objects.all().delete()
+        UnderpaymentBin.objects.bulk_create(
+            (
+                UnderpaymentBin(payer=payer, month=month, bin=b, claims=n)
+                for (payer, month, b), n in underpayment_bins(Claim.objects.all()).items()
+            ),
+            batch_size=1000,
+        )
+        DistinctSketch.objects.all().delete()
+        DistinctSketch.objects.bulk_create(
+            (
+                DistinctSketch(payer=payer, month=month, patients=bytes(patients), cpt_codes=bytes(codes))
+                for (payer, month), (patients, codes) in distinct_sketches(Claim.objects.all()).items()
+            ),
+            batch_size=500,
+        )
+
+
+def _measure_sums():
+    return {f"n_{m}": Sum(m) for m in MEASURES}
+
+
+def _grouping_sets_rows():
+    """Postgres: overall, per-status and per-payer sums from ONE scan via GROUPING SETS."""
+    qn = connection.ops.quote_name
+    sums = ", ".join(f"SUM({qn(m)})" for m in MEASURES)
+    sql = (
+        f"SELECT GROUPING({qn('status')}), GROUPING({qn('payer')}), {qn('status')}, {qn('payer')}, {sums} "
+        f"FROM {qn(ClaimRollup._meta.db_table)} WHERE {qn('claims')} > 0 "
+        f"GROUP BY GROUPING SETS ((), ({qn('status')}), ({qn('payer')}))"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        for g_status, g_payer, status, payer, *values in cursor.fetchall():
+            measures = {m: v or 0 for m, v in zip(MEASURES, values)}
+            if g_status and g_payer:
+                yield "total", None, measures
+            elif g_payer:
+                yield "status", status, measures
+            else:
+                yield "payer", payer, measures
+
+
+def _grouped_rows():
+    """Elsewhere: one (payer, status) grouped query, rolled up further in Python."""
+    rows = (
+        ClaimRollup.objects.filter(claims__gt=0).order_by()
+        .values("payer", "status").annotate(**_measure_sums())
+    )
+    for row in rows:
+        measures = {m: row[f"n_{m}"] or 0 for m in MEASURES}
+        yield "total", None, measures
+        yield "status", row["status"], measures
+        yield "payer", row["payer"], measures
+
+
+def totals(limit=10):
+    """
+    Dashboard numbers in one query: (overall measures, top `limit` statuses,
+    top `limit` payers by claim count), the latter as lists of dicts.
+    """
+    overall = dict.fromkeys(MEASURES, 0)
+    groups = {"status": new_deltas(), "payer": new_deltas()}
+    rows = _grouping_sets_rows() if connection.vendor == "postgresql" else _grouped_rows()
+    for kind, key, measures in rows:
+        if kind == "total":
+            for m, v in measures.items():
+                overall[m] += v
+        else:
+            add(groups[kind], key, measures)
+
+    def top(kind):
+        ranked = sorted(groups[kind].items(), key=lambda kv: (-kv[1]["claims"], kv[0]))[:limit]
+        return [{kind: key, "n": m["claims"], "billed": m["billed"], "paid": m["paid"]} for key, m in ranked]
+
+    return overall, top("status"), top("payer")
+
+
+def underpayment_sketches():
+    """
+    (overall sketch, {payer: sketch}) of amount - paid_amount, merged from the
+    stored bins in one grouped query; no claim is read or sorted.
+    """
+    overall, by_payer = LogSketch(), defaultdict(LogSketch)
+    rows = (
+        UnderpaymentBin.objects.filter(claims__gt=0).order_by()
+        .values("payer", "bin").annotate(n=Sum("claims")).values_list("payer", "bin", "n")
+    )
+    for payer, b, n in rows:
+        overall.counts[b] += n
+        by_payer[payer].counts[b] += n
+    return overall, dict(by_payer)
+
+
+def distinct_counts(payers=None, months=None):
+    """
+    Approximate (distinct patients, distinct CPT codes) over the given payers
+    and service months (all when None), merged from the stored sketches.
+    """
+    rows = DistinctSketch.objects.order_by()
+    if payers is not None:
+        rows = rows.filter(payer__in=payers)
+    if months is not None:
+        rows = rows.filter(month__in=months)
+    patients, codes = HyperLogLog(), HyperLogLog()
+    for p, c in rows.values_list("patients", "cpt_codes"):
+        patients.merge(HyperLogLog(p))
+        codes.merge(HyperLogLog(c))
+    return patients.count(), codes.count()
+
+
+def distinct_summary(months=12):
+    """
+    Distinct patients / CPT codes overall, per payer and for the latest
+    `months` service months, from one read of the sketches:
+    (overall, [{payer, patients, cpt_codes}], [{month, patients, cpt_codes}]).
+    """
+    overall = (HyperLogLog(), HyperLogLog())
+    by = {"payer": defaultdict(lambda: (HyperLogLog(), HyperLogLog())),
+          "month": defaultdict(lambda: (HyperLogLog(), HyperLogLog()))}
+    for payer, month, p, c in DistinctSketch.objects.order_by().values_list("payer", "month", "patients", "cpt_codes"):
+        p, c = HyperLogLog(p), HyperLogLog(c)
+        for target in (overall, by["payer"][payer], by["month"][month]):
+            target[0].merge(p)
+            target[1].merge(c)
+
+    def counts(kind, key, pair):
+        return {kind: key, "patients": pair[0].count(), "cpt_codes": pair[1].count()}
+
+    payers = sorted((counts("payer", k, v) for k, v in by["payer"].items()), key=lambda r: (-r["patients"], r["payer"]))
+    recent = sorted(by["month"].items(), reverse=True)[:months]
+    return (
+        {"patients": overall[0].count(), "cpt_codes": overall[1].count()},
+        payers,
+        [counts("month", k, v) for k, v in recent],
+    )
@@ -0,0 +1,94 @@
+"""
+Lean rows for the claims table.
+
+The table only shows a handful of columns, so the list fetches plain tuples via
+values_list(*ROW_FIELDS) instead of full Claim instances, and renders them with
+a precompiled format string instead of a template loop. Output matches what the
+old `{% for c in claims %}` loop produced.
+"""
+from functools import lru_cache
+
+from django.urls import reverse
+from django.utils.formats import date_format
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+# order matters: ROW_HTML and the cursor code index into these tuples
+ROW_FIELDS = (
+    "pk", "claim_id", "patient_name", "payer",
+    "amount", "paid_amount", "status", "service_date", "last_updated", "flagged", "note_count",
+)
+(PK, CLAIM_ID, PATIENT, PAYER, AMOUNT, PAID, STATUS, SERVICE_DATE, LAST_UPDATED, FLAGGED,
+ NOTE_COUNT) = range(len(ROW_FIELDS))
+
+# rows carry a stable id so writes can replace/remove one row out-of-band;
+# resting the pointer on a row warms its detail card (nothing is swapped)
+ROW_HTML = (
+    '<tr id="claim-row-{pk}"{oob}'
+    ' hx-get="{prefetch_url}" hx-trigger="mouseenter once delay:150ms" hx-swap="none">'
+    "<td>{claim_id}{flag}{notes}</td>"
+    "<td>{patient}</td>"
+    "<td>{payer}</td>"
+    "<td>${amount}</td>"
+    "<td>${paid}</td>"
+    "<td>{status}</td>"
+    "<td>{service_date}</td>"
+    "<td>"
+    '<button class="btn" hx-get="{url}" hx-target="#claim-table" hx-swap="outerHTML" hx-push-url="true">'
+    "View"
+    "</button>"
+    "</td>"
+    "</tr>"
+)
+
+_PK_PLACEHOLDER = 987654321
+
+
+@lru_cache(maxsize=None)
+def _url_template(name):
+    # reverse() once, then format the pk in per row
+    return reverse(name, args=[_PK_PLACEHOLDER]).replace(str(_PK_PLACEHOLDER), "{}")
+
+
+@lru_cache(maxsize=8192)
+def _fmt_date(d, lang):
+    # service dates repeat heavily across rows; lang keys the cache per locale
+    return date_format(d) if d else ""
+
+
+FLAG_BADGE = ' <span class="badge">Flagged</span>'
+NOTES_BADGE = ' <span class="muted">({} note{})</span>'
+
+
+def render_row(row, oob=False, query=""):
+    """
+    One <tr> for a ROW_FIELDS tuple (as an hx-swap-oob replacement when `oob`);
+    `query` (an escaped "?..." suffix) is appended to the View link so the detail
+    knows which list it was opened from.
+    """
+    return ROW_HTML.format(
+        pk=row[PK],
+        oob=' hx-swap-oob="true"' if oob else "",
+        claim_id=escape(row[CLAIM_ID]),
+        flag=FLAG_BADGE if row[FLAGGED] else "",
+        notes=NOTES_BADGE.format(row[NOTE_COUNT], "" if row[NOTE_COUNT] == 1 else "s") if row[NOTE_COUNT] else "",
+        patient=escape(row[PATIENT]),
+        payer=escape(row[PAYER]),
+        amount=row[AMOUNT],
+        paid=row[PAID],
+        status=escape(row[STATUS]),
+        service_date=_fmt_date(row[SERVICE_DATE], get_language()),
+        url=_url_template("claim-detail").format(row[PK]) + query,
+        prefetch_url=_url_template("claim-prefetch").format(row[PK]),
+    )
+
+
+def render_rows(rows, query=""):
+    query = escape(f"?{query}") if query else ""
+    return mark_safe("".join(render_row(r, query=query) for r in rows))
+
+
+def row_from_instance(claim):
+    """ROW_FIELDS tuple from a Claim already in memory (no query)."""
+    return tuple(getattr(claim, f) for f in ROW_FIELDS)
@@ -0,0 +1,128 @@
+from django.db.models import F, Max, OuterRef, QuerySet, Subquery
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import rollup
+from .cache import bump_claims_version, invalidate_claim
+from .counting import adjust_claim_count
+from .models import Claim, ClaimDetail, ClaimNote
+
+
+@receiver(post_save, sender=Claim)
+@receiver(post_delete, sender=Claim)
+def claim_changed(sender, instance, **kwargs):
+    """Any Claim write (views, admin) bumps the global version; importers bump once (rollup.deferred)."""
+    if not rollup.maintained():
+        return
+    bump_claims_version()
+    invalidate_claim(instance.pk)
+
+
+def _cascaded(origin):
+    """True for a detail/note delete that comes from deleting its claim(s)."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Claim
+
+
+@receiver(post_save, sender=ClaimDetail)
+@receiver(post_delete, sender=ClaimDetail)
+@receiver(post_save, sender=ClaimNote)
+@receiver(post_delete, sender=ClaimNote)
+def claim_part_changed(sender, instance, origin=None, **kwargs):
+    """Detail/note writes only invalidate that claim's cached card (once, via claim_changed, on a cascade)."""
+    if rollup.maintained() and not _cascaded(origin):
+        invalidate_claim(instance.claim_id)
+
+
+@receiver(post_save, sender=Claim)
+def claim_created(sender, created=False, raw=False, **kwargs):
+    if created and not raw and rollup.maintained():
+        adjust_claim_count(+1)
+
+
+@receiver(post_delete, sender=Claim)
+def claim_deleted(sender, **kwargs):
+    if rollup.maintained():
+        adjust_claim_count(-1)
+
+
+@receiver(post_save, sender=ClaimNote)
+def note_created(sender, instance, created=False, raw=False, **kwargs):
+    """Keep Claim.note_count / last_note_at current with one UPDATE (no read)."""
+    if created and not raw:
+        Claim.objects.filter(pk=instance.claim_id).update(
+            note_count=F("note_count") + 1, last_note_at=instance.created_at,
+        )
+        bump_claims_version()  # list rows show the count; update() sends no signals
+
+
+@receiver(post_delete, sender=ClaimNote)
+def note_deleted(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin):
+        return  # the claim row goes too
+    latest = ClaimNote.objects.filter(claim=OuterRef("pk")).order_by().values("claim").annotate(m=Max("created_at"))
+    Claim.objects.filter(pk=instance.claim_id, note_count__gt=0).update(
+        note_count=F("note_count") - 1, last_note_at=Subquery(latest.values("m")),
+    )
+    bump_claims_version()
+
+
+# stored values the rollup (SOURCE_FIELDS) and the sketches (the patient) depend on
+TRACKED_FIELDS = rollup.SOURCE_FIELDS + ("patient_name",)
+
+
+def _saved_values(instance, old, update_fields):
+    """TRACKED_FIELDS as stored after the save: fields left out of update_fields keep their old value."""
+    values = rollup.source_values(instance) + (instance.patient_name,)
+    if old is None or update_fields is None:
+        return values
+    return tuple(v if f in update_fields else o for f, v, o in zip(TRACKED_FIELDS, values, old))
+
+
+@receiver(pre_save, sender=Claim)
+def claim_before_save(sender, instance, raw=False, **kwargs):
+    """Remember (and lock, until Claim.save's transaction ends) the stored values the rollup takes back out."""
+    instance._rollup_old = None
+    if instance.pk and not raw and rollup.maintained():
+        instance._rollup_old = (
+            Claim.objects.select_for_update().filter(pk=instance.pk).values_list(*TRACKED_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Claim)
+def claim_rollup_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not rollup.maintained():
+        return
+    old = getattr(instance, "_rollup_old", None)
+    new = _saved_values(instance, old, update_fields)
+    rollup.apply_deltas(rollup.claim_deltas(old and old[:-1], new[:-1]))
+    payer, month, patient = new[0], new[2].replace(day=1), new[-1]
+    moved = old is None or (old[0], old[2].replace(day=1)) != (payer, month)
+    # same payer, month and patient: the sketches already hold everything
+    if moved or old[-1] != patient:
+        rollup.claim_distinct(instance.pk, payer, month, patient, moved)
+
+
+@receiver(pre_delete, sender=Claim)
+def claim_before_delete(sender, instance, **kwargs):
+    """The instance may be stale: take the stored (locked) values out of the rollup."""
+    if rollup.maintained():
+        instance._rollup_old = (
+            Claim.objects.select_for_update().filter(pk=instance.pk).values_list(*rollup.SOURCE_FIELDS).first()
+        )
+
+
+@receiver(post_delete, sender=Claim)
+def claim_rollup_deleted(sender, instance, **kwargs):
+    old = getattr(instance, "_rollup_old", None)
+    if rollup.maintained() and old is not None:
+        rollup.apply_deltas(rollup.claim_deltas(old, None))
+
+
+@receiver(post_save, sender=ClaimDetail)
+def detail_distinct_saved(sender, instance, raw=False, **kwargs):
+    """Count the detail's CPT codes in its claim's (payer, month) sketch."""
+    if raw or not rollup.maintained():
+        return
+    payer, service_date = Claim.objects.filter(pk=instance.claim_id).values_list("payer", "service_date").get()
+    rollup.add_distinct(payer, service_date.replace(day=1), cpt_codes=instance.cpt_list())
@@ -0,0 +1,85 @@
+"""
+Log-bucketed quantile sketch (DDSketch-style) for underpayment amounts.
+
+A value v falls into bin ±(k + 1) with k = ceil(log_gamma(|v| / MIN_VALUE)),
+gamma = (1 + ACCURACY) / (1 - ACCURACY); |v| below MIN_VALUE (i.e. zero to
+the cent) goes to bin 0. Reporting a bin's midpoint keeps every quantile
+within ACCURACY relative error. A sketch is just {bin: count}, so merging
+(across payers or months) is addition and removing a value is subtraction:
+the per (payer, month) counts in UnderpaymentBin are kept with the same
+F() increments as the rest of the rollup.
+"""
+import math
+from collections import Counter
+from decimal import Decimal
+
+ACCURACY = 0.01
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+MIN_VALUE = 0.01
+
+# histogram edges for the dashboard (underpayment in dollars)
+HISTOGRAM_EDGES = (0, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def bin_index(value):
+    v = float(value)
+    if abs(v) < MIN_VALUE:
+        return 0
+    k = max(0, math.ceil(math.log(abs(v) / MIN_VALUE) / _LOG_GAMMA - 1e-9))
+    return k + 1 if v > 0 else -(k + 1)
+
+
+def bin_value(index):
+    """Representative value of a bin (within ACCURACY of anything in it)."""
+    if index == 0:
+        return 0.0
+    v = MIN_VALUE * 2 * GAMMA ** (abs(index) - 1) / (GAMMA + 1)
+    return v if index > 0 else -v
+
+
+class LogSketch:
+    """{bin: count}; mergeable, and values can be taken back out."""
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def add(self, value, count=1):
+        self.counts[bin_index(value)] += count
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    @property
+    def n(self):
+        return sum(c for c in self.counts.values() if c > 0)
+
+    def _ordered(self):
+        return sorted((i, c) for i, c in self.counts.items() if c > 0)
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or None for an empty sketch."""
+        n = self.n
+        if not n:
+            return None
+        rank = q * (n - 1)
+        seen = 0
+        for index, count in self._ordered():
+            seen += count
+            if seen > rank:
+                return Decimal(str(round(bin_value(index), 2)))
+        return Decimal(str(round(bin_value(self._ordered()[-1][0]), 2)))
+
+    def histogram(self, edges=HISTOGRAM_EDGES):
+        """
+        [(label, count)]: at or below the first edge (paid in full or more),
+        one range per pair of edges, and above the last edge.
+        """
+        slots = [0] * (len(edges) + 1)
+        for index, count in self._ordered():
+            v = bin_value(index)
+            slot = 0 if v <= edges[0] else next((i for i, e in enumerate(edges) if v <= e), len(edges))
+            slots[slot] += count
+        labels = ["Paid in full"] + [f"${lo:,}–${hi:,}" for lo, hi in zip(edges, edges[1:])] + [f"> ${edges[-1]:,}"]
+        return list(zip(labels, slots))
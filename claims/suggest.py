@@ -0,0 +1,137 @@
+"""
+In-process prefix index for the search box typeahead.
+
+Each worker keeps a sorted list of (lowercased key, label) pairs per field and
+answers prefix queries with a bisect, so a keystroke never touches the claims
+table. The index compares its build version with the global claims version
+(claims.cache) and, when it moved, pulls only rows changed since the last
+`last_updated` it saw. Deletes are picked up by a periodic full rebuild, which
+runs on a side thread while keystrokes keep being answered from the current
+index; only the very first build happens on a request.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from .background import submit
+from .cache import claims_version
+from .models import Claim
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_LIMIT = 8
+REBUILD_SECONDS = 15 * 60
+
+
+class PrefixIndex:
+    def __init__(self, field):
+        self.field = field
+        self._keys = []          # sorted [(key, label)]
+        self._labels = set()
+        self._version = None
+        self._watermark = None   # newest last_updated already indexed
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilder = None   # Future of the background rebuild, if one ran
+
+    # ---------- maintenance ----------
+    @staticmethod
+    def _entries(label):
+        # the whole value plus every later word, so "rhod" finds "Virginia Rhodes"
+        words = label.lower().split()
+        return [(" ".join(words[i:]), label) for i in range(len(words))]
+
+    def _scan(self):
+        """(sorted keys, labels, newest last_updated) from a full pass over the table."""
+        labels, watermark = set(), None
+        rows = Claim.objects.order_by().values_list(self.field, "last_updated")
+        for label, ts in rows.iterator(chunk_size=5000):
+            label = (label or "").strip()
+            if label:
+                labels.add(label)
+            if watermark is None or ts > watermark:
+                watermark = ts
+        return sorted(e for label in labels for e in self._entries(label)), labels, watermark
+
+    def _install(self, version, keys, labels, watermark):
+        # built aside and swapped in, so concurrent readers never see a half-built index
+        self._keys, self._labels, self._watermark = keys, labels, watermark
+        self._version = version
+        self._built_at = time.monotonic()
+
+    def _expired(self):
+        return time.monotonic() - self._built_at > REBUILD_SECONDS
+
+    def _catch_up(self, version):
+        rows = Claim.objects.order_by().values_list(self.field, "last_updated")
+        if self._watermark is not None:
+            rows = rows.filter(last_updated__gte=self._watermark)
+        added, watermark = set(), self._watermark
+        for label, ts in rows:
+            label = (label or "").strip()
+            if label and label not in self._labels:
+                added.add(label)
+            if watermark is None or ts > watermark:
+                watermark = ts
+        # merged aside and swapped in like a full build; search() reads _keys without the lock
+        keys = self._keys
+        if added:
+            keys = sorted(keys + [e for label in added for e in self._entries(label)])
+        self._keys, self._labels, self._watermark = keys, self._labels | added, watermark
+        self._version = version
+
+    def refresh(self):
+        version = claims_version()
+        if version == self._version and not self._expired():
+            return
+        with self._lock:
+            # re-checked under the lock: requests that queued behind a build reuse it
+            if self._version is None:
+                self._install(version, *self._scan())
+            elif version != self._version:
+                self._catch_up(version)
+            if self._expired():
+                self._rebuild_in_background()
+
+    def _rebuild_in_background(self):
+        """Queue the periodic rebuild on a side thread (call under _lock)."""
+        self._built_at = time.monotonic()  # don't start another one meanwhile
+        self._rebuilder = submit("claim-suggest", self.rebuild)
+
+    def rebuild(self):
+        """
+        Full rebuild, dropping labels no claim carries any more. The version is
+        read before the scan, so writes that land during it are picked up by
+        the next refresh's catch-up from the scan's watermark.
+        """
+        try:
+            version = claims_version()
+            built = self._scan()
+            with self._lock:
+                self._install(version, *built)
+        except Exception:
+            logger.exception("rebuilding the %s suggestion index failed", self.field)
+
+    # ---------- lookup ----------
+    def search(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = " ".join((prefix or "").lower().split())
+        if not prefix:
+            return []
+        self.refresh()
+        keys = self._keys
+        out, seen = [], set()
+        i = bisect_left(keys, (prefix, ""))
+        while i < len(keys) and len(out) < limit:
+            key, label = keys[i]
+            if not key.startswith(prefix):
+                break
+            if label not in seen:
+                seen.add(label)
+                out.append(label)
+            i += 1
+        return out
+
+
+patient_index = PrefixIndex("patient_name")
+payer_index = PrefixIndex("payer")
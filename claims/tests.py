@@ -1,3 +1,987 @@
-from django.test import TestCase
+import re
+import unittest
+from datetime import date
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import analytics, background, rollup
+from .admin import ClaimAdmin
+from .bulk import run_bulk
+from .cache import bump_claims_version, claims_version, is_shared, single_flight
+from .checks import shared_cache_check
+from .counting import claim_row_count, count_claims, recount_claims
+from .detail import NOTES_PAGE_SIZE, encode_note_cursor, older_notes
+from .forms import ClaimFilterForm
+from .models import Claim, ClaimDetail, ClaimNote, ClaimRollup, DistinctSketch, UnderpaymentBin
+from .paging import (
+    DEFAULT_SORT, PAGE_SIZE, SORTS, _seek, decode_cursor, keyset_page, neighbour_seeks, neighbours, sorted_claims,
+)
+from .management.commands.bench_claim_table import MODEL_ROWS_TEMPLATE, synthetic_rows
+from .rows import ROW_FIELDS, render_rows
+from .sketch import ACCURACY, LogSketch
+from .suggest import PrefixIndex
+
+
+# full pages link static assets; skip the collectstatic manifest in tests
+PLAIN_STATIC = {"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}}
+
+
+def make_claims(n=40):
+    payers = ["Aetna", "Blue Cross", "Cigna"]
+    statuses = ["Denied", "Paid", "Under Review"]
+    Claim.objects.bulk_create(
+        Claim(
+            claim_id=str(30000 + i),
+            patient_name=f"Patient {i}",
+            payer=payers[i % 3],
+            amount=Decimal(1000 + i),
+            paid_amount=Decimal(500 + 40 * i),
+            status=statuses[i % 3],
+            service_date=date(2022, 1 + i % 12, 1),
+            flagged=(i % 7 == 0),
+        )
+        for i in range(n)
+    )
+
+
+class ClaimFilterIndexTests(TestCase):
+    """Every supported filter combination must be answerable from an index, not a full scan."""
+
+    COMBINATIONS = [
+        {"status": "Denied"},
+        {"payer": "Aetna"},
+        {"payer": "Aetna", "status": "Denied"},
+        {"billed_min": "100", "billed_max": "5000"},
+        {"paid_min": "1", "paid_max": "100"},
+        {"service_from": "2022-01-01", "service_to": "2022-03-31"},
+        {"payer": "Aetna", "service_from": "2022-01-01", "service_to": "2022-03-31"},
+        {"status": "Denied", "service_from": "2022-01-01", "service_to": "2022-03-31"},
+        {"flagged": "1"},
+        {"underpaid": "1"},
+        {"payer": "Aetna", "flagged": "1"},
+        {"status": "Denied", "underpaid": "1"},
+        {"has_notes": "1"},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+
+    def plan(self, params):
+        form = ClaimFilterForm(params)
+        self.assertTrue(form.is_valid(), form.errors)
+        qs = form.filter_queryset(Claim.objects.all())
+        # the exact shape claim_list runs for one page
+        qs = qs.order_by("-last_updated", "-pk").values_list(*ROW_FIELDS)[:PAGE_SIZE + 1]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                # tiny test tables always favour a seq scan; ask whether an index *can* serve it
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return qs.explain()
+
+    def test_each_filter_combination_uses_an_index(self):
+        for params in self.COMBINATIONS:
+            with self.subTest(**params):
+                plan = self.plan(params)
+                if connection.vendor == "sqlite":
+                    self.assertNotRegex(plan, r"SCAN claims_claim(?! USING)")
+                    self.assertRegex(plan, r"USING (COVERING )?INDEX")
+                else:
+                    self.assertNotIn("Seq Scan", plan)
+
+    def test_filters_select_matching_rows(self):
+        form = ClaimFilterForm({"payer": "Aetna", "underpaid": "1"})
+        rows = form.filter_queryset(Claim.objects.all())
+        self.assertTrue(rows.exists())
+        for c in rows:
+            self.assertEqual(c.payer, "Aetna")
+            self.assertGreater(c.amount, c.paid_amount)
+
+    def test_status_is_case_insensitive(self):
+        for value in ("denied", " DENIED ", "Denied"):
+            with self.subTest(status=value):
+                form = ClaimFilterForm({"status": value})
+                self.assertEqual(form.params(), {"status": "Denied"})
+                self.assertEqual(form.filter_queryset(Claim.objects.all()).count(),
+                                 Claim.objects.filter(status="Denied").count())
+
+    def test_inverted_range_is_dropped(self):
+        form = ClaimFilterForm({"billed_min": "500", "billed_max": "10", "status": "Denied"})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.spec, {"billed_min": Decimal("500"), "status": "Denied"})
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0)
+class ClaimNumberSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        for claim_id in ("CLM-10", "CLM-11", "CLM15"):
+            Claim.objects.create(claim_id=claim_id, patient_name="P", payer="Aetna", amount=Decimal("1.00"),
+                                 paid_amount=Decimal("1.00"), status="Paid", service_date=date(2022, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, q, **headers):
+        response = self.client.get(reverse("claim-list"), {"q": q}, HTTP_HX_REQUEST="true", **headers)
+        ids = re.findall(r'<tr id="claim-row-\d+"[^>]*>\s*<td>([^<]+)', response.content.decode())
+        return response, {i.strip() for i in ids}
+
+    def test_exact_prefix_and_fallback(self):
+        self.assertEqual(self.search("30005")[1], {"30005"})
+        self.assertEqual(self.search("3001")[1], {str(30010 + i) for i in range(10)})
+        # a prefix match, not a collation range: CLM15 must stay out
+        self.assertEqual(self.search("CLM-1")[1], {"CLM-10", "CLM-11"})
+        # claim-number shaped but no claim_id hit: the general search takes over
+        self.assertEqual(self.search("0039")[1], {"30039"})
+
+    def test_full_page_exact_match_redirects(self):
+        claim = Claim.objects.get(claim_id="30005")
+        response = self.client.get(reverse("claim-list"), {"q": "30005"})
+        self.assertRedirects(response, reverse("claim-detail", args=[claim.pk]), fetch_redirect_response=False)
+        # more than one filter (or a prefix only) stays on the list
+        self.assertEqual(self.client.get(reverse("claim-list"), {"q": "3001"}).status_code, 200)
+
+    def test_cached_list_revalidates_without_queries(self):
+        response, _ = self.search("3001")
+        with self.assertNumQueries(0):
+            again, _ = self.search("3001", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0)
+class ClaimListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_claim_write_changes_key_and_served_table(self):
+        from .views import _list_cache_key
+
+        url = reverse("claim-list")
+        key = _list_cache_key("list", q="Patient 3")
+        first = self.client.get(url, {"q": "Patient 3"}, HTTP_HX_REQUEST="true")
+        self.assertNotContains(first, "Renamed")
+        claim = Claim.objects.get(claim_id="30003")
+        claim.patient_name = "Patient 3 Renamed"
+        claim.save()
+        self.assertNotEqual(_list_cache_key("list", q="Patient 3"), key)
+        again = self.client.get(url, {"q": "Patient 3"}, HTTP_HX_REQUEST="true", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, "Patient 3 Renamed")
+
+    def test_note_writes_change_the_list_etag(self):
+        url = reverse("claim-list")
+        first = self.client.get(url, {"q": "Patient 3"}, HTTP_HX_REQUEST="true")
+        claim = Claim.objects.get(claim_id="30003")
+        note = ClaimNote.objects.create(claim=claim, body="called payer")
+        again = self.client.get(url, {"q": "Patient 3"}, HTTP_HX_REQUEST="true", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 200)
+        self.assertContains(again, "(1 note)")
+        note.delete()
+        last = self.client.get(url, {"q": "Patient 3"}, HTTP_HX_REQUEST="true", HTTP_IF_NONE_MATCH=again["ETag"])
+        self.assertEqual(last.status_code, 200)
+        self.assertNotContains(last, "(1 note)")
+
+    def test_signing_in_changes_the_list_etag(self):
+        url = reverse("claim-list")
+        anonymous = self.client.get(url, HTTP_HX_REQUEST="true")
+        self.assertNotContains(anonymous, "Apply to all matching")
+        self.client.force_login(get_user_model().objects.create_user("reviewer", password="x"))
+        signed_in = self.client.get(url, HTTP_HX_REQUEST="true", HTTP_IF_NONE_MATCH=anonymous["ETag"])
+        self.assertEqual(signed_in.status_code, 200)
+        self.assertContains(signed_in, "Apply to all matching")
+        self.assertIn("Cookie", signed_in["Vary"])
+
+    def test_process_local_cache_is_flagged(self):
+        self.assertFalse(is_shared())
+        self.assertEqual([w.id for w in shared_cache_check(None)], ["claims.W001"])
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(CACHES=redis):
+            self.assertTrue(is_shared())
+            self.assertEqual(shared_cache_check(None), [])
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0)
+class ClaimFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def counts(html, label):
+        """{value: n} from the "Status:" / "Payer:" line of the facet panel."""
+        line = re.search(rf"{label}:(.*?)</div>", html, re.S).group(1)
+        return {v: int(n) for v, n in re.findall(r">([^<>]+) \((\d+)\)</a>", line)}
+
+    def test_counts_match_per_status_and_per_payer(self):
+        for params in ({}, {"q": "Patient 1"}, {"service_from": "2022-03-01", "service_to": "2022-08-31"}):
+            with self.subTest(**params):
+                qs = ClaimFilterForm(params).filter_queryset(Claim.objects.all())
+                if "q" in params:
+                    qs = qs.filter(patient_name__icontains=params["q"])
+                html = self.client.get(reverse("claim-list"), params).content.decode()
+                for field, label in (("status", "Status"), ("payer", "Payer")):
+                    expected = dict(qs.order_by().values_list(field).annotate(n=Count("pk")))
+                    self.assertEqual(self.counts(html, label), expected)
+                self.assertIn(f"<b>{qs.count()}</b> claims", html)
+
+    def test_estimated_counts_do_not_aggregate_the_result(self):
+        with mock.patch("claims.counting.EXACT_COUNT_THRESHOLD", 10), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("claim-list"), {"q": "Patient"}, HTTP_HX_REQUEST="true")
+        self.assertContains(response, "approximate")
+        self.assertFalse([q for q in queries if "MAX(" in q["sql"].upper()])
+        newest = Claim.objects.order_by("-last_updated").values_list("last_updated", flat=True).first()
+        self.assertEqual(response["Last-Modified"], http_date(newest.timestamp()))
+
+    def test_htmx_search_swaps_facets_out_of_band(self):
+        response = self.client.get(reverse("claim-list"), {"status": "Denied"}, HTTP_HX_REQUEST="true")
+        html = response.content.decode()
+        self.assertIn('<div id="facets" class="card" style="margin-bottom:1rem;" hx-swap-oob="true">', html)
+        self.assertEqual(self.counts(html, "Status"), {"Denied": Claim.objects.filter(status="Denied").count()})
+        # "Next page" keeps the panel as it is
+        _, cursor = keyset_page(Claim.objects.filter(status="Denied"), None, DEFAULT_SORT, size=5)
+        page_two = self.client.get(reverse("claim-list"), {"status": "Denied", "cursor": cursor},
+                                   HTTP_HX_REQUEST="true")
+        self.assertContains(page_two, "<tr id=")
+        self.assertNotContains(page_two, 'id="facets"')
+
+
+class PrefixIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(12)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_build_then_incremental_catch_up(self):
+        index = PrefixIndex("patient_name")
+        with self.assertNumQueries(1):
+            self.assertEqual(index.search("patient 1", limit=20), ["Patient 1", "Patient 10", "Patient 11"])
+        with self.assertNumQueries(0):
+            index.search("patient")
+        Claim.objects.create(claim_id="X4", patient_name="Virginia Rhodes", payer="Aetna", amount=Decimal("1.00"),
+                             paid_amount=Decimal("0.00"), status="Paid", service_date=date(2022, 1, 1))
+        with self.assertNumQueries(1):  # only rows changed since the watermark
+            self.assertEqual(index.search("rhod"), ["Virginia Rhodes"])
+
+    def test_catch_up_swaps_in_a_new_key_list(self):
+        index = PrefixIndex("patient_name")
+        index.search("patient")
+        held = index._keys  # what a concurrent search() may be bisecting
+        before = list(held)
+        Claim.objects.create(claim_id="X5", patient_name="Aaron Abbott", payer="Aetna", amount=Decimal("1.00"),
+                             paid_amount=Decimal("0.00"), status="Paid", service_date=date(2022, 1, 1))
+        self.assertEqual(index.search("abbott"), ["Aaron Abbott"])
+        self.assertEqual(held, before)
+        self.assertIsNot(index._keys, held)
+
+    def test_expired_index_rebuilds_off_the_request(self):
+        index = PrefixIndex("patient_name")
+        index.search("patient")
+        Claim.objects.filter(patient_name="Patient 3").delete()
+        index.search("patient")  # catch-up after the delete's version bump
+        index._built_at = 0.0
+        with mock.patch.object(PrefixIndex, "_rebuild_in_background") as background, self.assertNumQueries(0):
+            self.assertIn("Patient 3", index.search("patient 3"))
+        background.assert_called_once()
+        index.rebuild()  # what the side thread runs
+        self.assertEqual(index.search("patient 3"), [])
+
+    def test_suggest_view(self):
+        with mock.patch("claims.views.patient_index", PrefixIndex("patient_name")), \
+             mock.patch("claims.views.payer_index", PrefixIndex("payer")):
+            response = self.client.get(reverse("claim-suggest"), {"q": "aet"})
+            self.assertContains(response, "Aetna")
+            # claim numbers are searched, not suggested
+            self.assertEqual(self.client.get(reverse("claim-suggest"), {"q": "3001"}).context["payers"], [])
+
+
+class KeysetSortTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+
+    def test_paging_matches_full_ordering_for_every_sort(self):
+        for sort in [d + k for k in SORTS for d in ("", "-")]:
+            with self.subTest(sort=sort):
+                seen, cursor = [], None
+                while True:
+                    rows, cursor = keyset_page(Claim.objects.all(), cursor, sort, size=7)
+                    seen += [r[0] for r in rows]
+                    if not cursor:
+                        break
+                expected = list(sorted_claims(Claim.objects.all(), sort)[0].values_list("pk", flat=True))
+                self.assertEqual(seen, expected)
+
+    def assertSeeks(self, qs):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            self.assertRegex(qs.explain(), r"Index Cond: .*(>=|<=)")
+        else:
+            self.assertRegex(qs.explain(), r"SEARCH claims_claim USING (COVERING )?INDEX claim_\w+_id_idx \(\w+[<>]")
+
+    def test_seeked_page_starts_inside_the_index(self):
+        for sort in [d + k for k in SORTS for d in ("", "-")]:
+            with self.subTest(sort=sort):
+                _, cursor = keyset_page(Claim.objects.all(), None, sort, size=5)
+                qs, column, desc = sorted_claims(Claim.objects.all(), sort)
+                value, pk = decode_cursor(cursor, sort)
+                self.assertSeeks(_seek(qs, column, value, pk, "lt" if desc else "gt").values_list(*ROW_FIELDS)[:6])
+
+    def test_neighbour_seeks_start_at_the_row(self):
+        row = Claim.objects.order_by("pk").values_list(*ROW_FIELDS)[20]
+        for sort in [d + k for k in SORTS for d in ("", "-")]:
+            with self.subTest(sort=sort):
+                for seek in neighbour_seeks(Claim.objects.all(), row, sort):
+                    self.assertSeeks(seek[:1])
+
+    def test_cursor_from_another_sort_restarts(self):
+        _, cursor = keyset_page(Claim.objects.all(), None, "-billed", size=5)
+        rows, _ = keyset_page(Claim.objects.all(), cursor, "payer", size=5)
+        first, _ = keyset_page(Claim.objects.all(), None, "payer", size=5)
+        self.assertEqual(rows, first)
+
+    def test_neighbours_match_full_ordering(self):
+        qs = Claim.objects.filter(status="Denied")
+        for sort in ("-updated", "billed", "payer"):
+            with self.subTest(sort=sort):
+                expected = list(sorted_claims(qs, sort)[0].values_list(*ROW_FIELDS))
+                for i, row in enumerate(expected):
+                    prev_pk, next_pk = neighbours(qs, row, sort)
+                    self.assertEqual(prev_pk, expected[i - 1][0] if i else None)
+                    self.assertEqual(next_pk, expected[i + 1][0] if i + 1 < len(expected) else None)
+
+
+class RowRenderingTests(TestCase):
+    """The row formatter must produce exactly what the old template loop did."""
+
+    def test_formatter_matches_template_loop(self):
+        template = engines["django"].from_string(MODEL_ROWS_TEMPLATE)
+        rows = synthetic_rows(300)  # escaping, flags, 0/1/n notes, many dates
+        claims = [Claim(pk=r[0], **dict(zip(ROW_FIELDS[1:], r[1:]))) for r in rows]
+        self.assertEqual(render_rows(rows), template.render({"claims": claims}))
+
+    def test_rows_from_the_database(self):
+        make_claims()
+        rows = list(Claim.objects.order_by("pk").values_list(*ROW_FIELDS))
+        claims = list(Claim.objects.order_by("pk"))
+        template = engines["django"].from_string(MODEL_ROWS_TEMPLATE)
+        self.assertEqual(render_rows(rows), template.render({"claims": claims}))
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ClaimDetailQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(3)
+        cls.claim = Claim.objects.first()
+        ClaimDetail.objects.create(claim=cls.claim, cpt_codes="99204,82947", denial_reason="Out-of-network provider")
+        author = get_user_model().objects.create_user("reviewer", password="x")
+        for i in range(3):
+            ClaimNote.objects.create(claim=cls.claim, author=author, body=f"note {i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_renders_claim_detail_and_notes_in_two_queries(self):
+        url = reverse("claim-detail", args=[self.claim.pk])
+        for headers in ({}, {"HTTP_HX_REQUEST": "true"}):
+            with self.subTest(htmx=bool(headers)), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), 2)
+            self.assertContains(response, "Out-of-network provider")
+            self.assertContains(response, "note 2")
+            self.assertContains(response, "reviewer")
+            self.assertNotContains(response, 'hx-trigger="load"')
+
+    def test_repeat_opens_are_served_from_cache_until_a_write(self):
+        url = reverse("claim-detail", args=[self.claim.pk])
+        headers = {"HTTP_HX_REQUEST": "true"}
+        self.client.get(url, **headers)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        self.assertEqual(len(queries), 0)
+        self.assertContains(response, "note 2")
+
+        ClaimNote.objects.create(claim=self.claim, author=get_user_model().objects.get(), body="fresh note")
+        self.assertContains(self.client.get(url, **headers), "fresh note")
+        detail = ClaimDetail.objects.get(claim=self.claim)
+        detail.denial_reason = "Duplicate claim"
+        detail.save()
+        self.assertContains(self.client.get(url, **headers), "Duplicate claim")
+
+    def test_writes_that_keep_the_stamps_still_revalidate(self):
+        url = reverse("claim-detail", args=[self.claim.pk])
+        headers = {"HTTP_HX_REQUEST": "true"}
+        etag = self.client.get(url, **headers)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers).status_code, 304)
+
+        detail = ClaimDetail.objects.get(claim=self.claim)
+        detail.denial_reason = "Duplicate claim"
+        detail.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Duplicate claim")
+
+        # the newest note (and so last_note_at) stays put
+        ClaimNote.objects.get(body="note 0").delete()
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+        self.assertEqual(again.status_code, 200)
+        self.assertNotContains(again, "note 0")
+
+    @override_settings(CLAIMS_PREFETCH_WORKERS=0)
+    def test_hovered_row_is_warmed_for_the_next_open(self):
+        pk = Claim.objects.exclude(pk=self.claim.pk).values_list("pk", flat=True).first()
+        self.assertEqual(self.client.get(reverse("claim-prefetch", args=[pk])).status_code, 204)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("claim-detail", args=[pk]), HTTP_HX_REQUEST="true")
+        self.assertEqual(len(queries), 0)
+        self.assertContains(response, f"claim-card-{pk}")
+
+
+class ClaimNotesPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(2)
+        cls.claim = Claim.objects.first()
+        author = get_user_model().objects.create_user("reviewer", password="x")
+        for i in range(NOTES_PAGE_SIZE * 2 + 5):
+            ClaimNote.objects.create(claim=cls.claim, author=author, body=f"note {i}")
+
+    def test_denormalized_note_stats(self):
+        self.claim.refresh_from_db()
+        self.assertEqual(self.claim.note_count, NOTES_PAGE_SIZE * 2 + 5)
+        self.assertEqual(self.claim.last_note_at, self.claim.notes.latest("created_at").created_at)
+        form = ClaimFilterForm({"has_notes": "1"})
+        self.assertEqual(list(form.filter_queryset(Claim.objects.all())), [self.claim])
+
+        self.claim.notes.first().delete()
+        self.claim.refresh_from_db()
+        self.assertEqual(self.claim.note_count, NOTES_PAGE_SIZE * 2 + 4)
+
+    def test_older_notes_page_seeks(self):
+        notes = list(ClaimNote.objects.filter(claim=self.claim).order_by("-created_at", "-id")[:NOTES_PAGE_SIZE])
+        qs = older_notes(self.claim.pk, encode_note_cursor(notes[-1]))[:NOTES_PAGE_SIZE + 1]
+        if connection.vendor == "sqlite":
+            plan = qs.explain()
+            self.assertRegex(plan, r"SEARCH claims_claimnote USING INDEX note_claim_created_idx \(claim_id=\? AND")
+
+    def test_deleting_a_claim_skips_per_note_bookkeeping(self):
+        ClaimDetail.objects.create(claim=self.claim, cpt_codes="99204")
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch("claims.signals.invalidate_claim") as invalidate:
+            Claim.objects.get(pk=self.claim.pk).delete()
+        invalidate.assert_called_once_with(self.claim.pk)
+        self.assertLess(len(queries), 20)
+        self.assertFalse(ClaimNote.objects.exists())
+
+    def test_older_notes_pages_cover_every_note_once(self):
+        expected = list(self.claim.notes.order_by("-created_at", "-id").values_list("body", flat=True))
+        seen, url = [], reverse("note-list", args=[self.claim.pk])
+        while url:
+            html = self.client.get(url, HTTP_HX_REQUEST="true").content.decode()
+            seen += re.findall(r"— (note \d+)", html)
+            url = html.split('hx-get="')[1].split('"')[0].replace("&amp;", "&") if "Older notes" in html else None
+        self.assertEqual(seen, expected)
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0)
+class ClaimFlagToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(2)
+        cls.claim = Claim.objects.get(flagged=False, claim_id="30001")
+        cls.user = get_user_model().objects.create_user("reviewer", password="x")
+
+    def toggle(self):
+        return self.client.post(reverse("claim-flag", args=[self.claim.pk]), HTTP_HX_REQUEST="true")
+
+    def test_toggle_is_one_update_and_flips_each_time(self):
+        self.client.force_login(self.user)
+        before = self.claim.last_updated
+        for flagged in (True, False, True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.toggle()
+            table = connection.ops.quote_name(Claim._meta.db_table)
+            writes = [q["sql"] for q in queries if q["sql"].lstrip().startswith(f"UPDATE {table}")]
+            self.assertEqual(len(writes), 1)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, f'id="claim-row-{self.claim.pk}" hx-swap-oob="true"')
+            self.assertContains(response, "Unflag" if flagged else "Flag for Review")
+            claim = Claim.objects.get(pk=self.claim.pk)
+            self.assertEqual(claim.flagged, flagged)
+            self.assertGreater(claim.last_updated, before)
+            before = claim.last_updated
+
+    def test_toggle_without_returning_support(self):
+        self.client.force_login(self.user)
+        with mock.patch("claims.views._update_returning_supported", return_value=False):
+            self.assertContains(self.toggle(), "Unflag")
+        self.assertTrue(Claim.objects.get(pk=self.claim.pk).flagged)
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ClaimOutOfBandWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(3)
+        cls.claim = Claim.objects.get(claim_id="30001")
+        cls.user = get_user_model().objects.create_user("reviewer", password="x")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_edit_returns_the_row_and_card_out_of_band(self):
+        data = {
+            "claim_id": "30001", "patient_name": "Renamed Patient", "payer": "Aetna", "amount": "1001.00",
+            "paid_amount": "540.00", "status": "Appealed", "service_date": "2022-02-01",
+        }
+        response = self.client.post(reverse("claim-update", args=[self.claim.pk]), data, HTTP_HX_REQUEST="true")
+        self.assertContains(response, f'<tr id="claim-row-{self.claim.pk}" hx-swap-oob="true"')
+        self.assertContains(response, f'<div id="claim-card-{self.claim.pk}" hx-swap-oob="true">')
+        self.assertContains(response, "<td>Renamed Patient</td>")
+        self.assertContains(response, "<b>Status:</b> Appealed")
+        self.assertNotContains(response, 'id="claim-table"')
+
+    def test_delete_removes_the_row_out_of_band(self):
+        pk = self.claim.pk
+        response = self.client.post(reverse("claim-delete", args=[pk]), HTTP_HX_REQUEST="true")
+        self.assertContains(response, f'<tr id="claim-row-{pk}" hx-swap-oob="delete"></tr>')
+        self.assertContains(response, f'<div id="claim-card-{pk}" hx-swap-oob="true">')
+        self.assertFalse(Claim.objects.filter(pk=pk).exists())
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0, CLAIMS_BULK_BACKGROUND=False)
+class ClaimBulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        cls.user = get_user_model().objects.create_user("reviewer", password="x")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_bulk_updates_exactly_the_filtered_claims_in_chunks(self):
+        matching = set(Claim.objects.filter(payer="Aetna", status="Denied").values_list("pk", flat=True))
+        version = claims_version()
+        with mock.patch("claims.bulk.BULK_CHUNK", 3):
+            response = self.client.post(reverse("claim-bulk"), {
+                "payer": "Aetna", "status": "Denied", "action": "status", "to_status": "Appealed",
+            }, HTTP_HX_REQUEST="true")
+        self.assertContains(response, f"{len(matching)} claims updated")
+        self.assertEqual(set(Claim.objects.filter(status="Appealed").values_list("pk", flat=True)), matching)
+        self.assertFalse(Claim.objects.filter(payer="Aetna", status="Denied").exists())
+        self.assertEqual(claims_version(), version + 1)  # invalidated once, not per chunk
+
+    @override_settings(CLAIMS_BULK_BACKGROUND=True)
+    def test_large_sets_run_on_the_shared_bulk_pool(self):
+        with mock.patch("claims.bulk.BULK_CHUNK", 3), mock.patch("claims.bulk.submit") as submit:
+            self.client.post(reverse("claim-bulk"), {"payer": "Aetna", "action": "flag"}, HTTP_HX_REQUEST="true")
+        submit.assert_called_once()
+        self.assertEqual(submit.call_args.args[:2], ("claim-bulk", run_bulk))
+
+    def test_background_tasks_close_their_connections(self):
+        with mock.patch("claims.background.connections") as connections:
+            self.assertEqual(background.submit("claim-test", sum, [1, 2]).result(), 3)
+        connections.close_all.assert_called_once()
+
+    def test_unknown_action_is_rejected(self):
+        response = self.client.post(reverse("claim-bulk"), {"payer": "Aetna", "action": "status"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Claim.objects.filter(status="").exists())
+
+
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0)
+class ClaimRollupTests(TestCase):
+    """Incremental upkeep must always equal a rebuild from scratch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        cls.user = get_user_model().objects.create_user("reviewer", password="x")
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        buckets = {
+            (b.payer, b.status, b.month): (b.claims, b.billed, b.paid, b.underpaid, b.underpayment, b.flagged)
+            for b in ClaimRollup.objects.filter(claims__gt=0)
+        }
+        bins = set(UnderpaymentBin.objects.filter(claims__gt=0).values_list("payer", "month", "bin", "claims"))
+        return buckets, bins
+
+    def assertRollupConsistent(self):
+        maintained = self.snapshot()
+        rollup.rebuild()
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_writes_keep_rollup_in_step(self):
+        # make_claims uses bulk_create (no signals), so start from a rebuild
+        rollup.rebuild()
+        self.client.force_login(self.user)
+
+        claim = Claim.objects.get(claim_id="30002")
+        claim.status, claim.paid_amount, claim.service_date = "Paid", claim.amount + 5, date(2023, 6, 9)
+        claim.save()
+        Claim.objects.create(claim_id="X1", patient_name="New", payer="Cigna", amount=Decimal("90.00"),
+                             paid_amount=Decimal("10.00"), status="Denied", service_date=date(2022, 2, 3))
+        Claim.objects.get(claim_id="30003").delete()
+        self.assertRollupConsistent()
+
+        self.client.post(reverse("claim-flag", args=[claim.pk]))
+        self.assertRollupConsistent()
+
+        self.client.post(reverse("claim-bulk"), {"payer": "Aetna", "action": "flag"})
+        self.client.post(reverse("claim-bulk"), {"status": "Denied", "action": "status", "to_status": "Appealed"})
+        self.assertRollupConsistent()
+
+    def test_edit_keeps_a_flag_toggled_meanwhile(self):
+        rollup.rebuild()
+        self.client.force_login(self.user)
+        stale = Claim.objects.get(claim_id="30002")  # loaded by the edit before the toggle lands
+        self.client.post(reverse("claim-flag", args=[stale.pk]))
+        data = {f: getattr(stale, f) for f in ("claim_id", "patient_name", "payer", "amount", "paid_amount",
+                                               "service_date")}
+        with mock.patch("claims.views.get_object_or_404", return_value=stale):
+            self.client.post(reverse("claim-update", args=[stale.pk]), {**data, "status": "Appealed"})
+        claim = Claim.objects.get(pk=stale.pk)
+        self.assertEqual((claim.status, claim.flagged), ("Appealed", not stale.flagged))
+        self.assertRollupConsistent()
+
+    def test_deleting_a_stale_instance(self):
+        rollup.rebuild()
+        stale = Claim.objects.get(claim_id="30004")
+        Claim.objects.filter(pk=stale.pk).update(status="Paid", flagged=not stale.flagged)
+        rollup.rebuild()
+        stale.delete()
+        self.assertRollupConsistent()
+
+    def test_deferred_loads_catch_up_once(self):
+        version = claims_version()
+        with mock.patch("claims.signals.adjust_claim_count") as adjust, rollup.deferred():
+            for i in range(5):
+                Claim.objects.create(claim_id=f"L{i}", patient_name="Loaded", payer="Humana", amount=Decimal("9.00"),
+                                     paid_amount=Decimal("1.00"), status="Denied", service_date=date(2022, 4, 1))
+            self.assertEqual(claims_version(), version)
+        adjust.assert_not_called()
+        self.assertEqual(claims_version(), version + 1)
+        self.assertEqual(claim_row_count(), Claim.objects.count())
+        self.assertRollupConsistent()
+
+    def test_string_values_are_normalized(self):
+        rollup.rebuild()
+        claim = Claim.objects.create(claim_id="X2", patient_name="Str", payer="Cigna", amount="90.00",
+                                     paid_amount="10.5", status="Denied", service_date="2022-01-05")
+        claim.service_date, claim.amount = "2022-03-07", "95"
+        claim.save()
+        self.assertRollupConsistent()
+        claim.delete()
+        self.assertRollupConsistent()
+
+    def panel(self, name):
+        return self.client.get(reverse("dashboard-panel", args=[name]))
+
+    def test_dashboard_totals_match_claims(self):
+        rollup.rebuild()
+        agg = self.panel("totals").context["agg"]
+        self.assertEqual(agg["total_claims"], Claim.objects.count())
+        self.assertEqual(agg["total_flagged"], Claim.objects.filter(flagged=True).count())
+        self.assertEqual(agg["sum_billed"], sum(c.amount for c in Claim.objects.all()))
+        status = {row["status"]: row["n"] for row in self.panel("status").context["status_counts"]}
+        self.assertEqual(status, {s: Claim.objects.filter(status=s).count() for s in status})
+        months = self.panel("trends").context["charts"][0]["rows"]
+        self.assertEqual(sum(m["claims"] for m in months), Claim.objects.count())
+
+    def test_dashboard_query_count_is_fixed(self):
+        rollup.rebuild()
+        make_claims(20)  # more rows must not mean more queries
+        rollup.rebuild()
+        # the page itself is a shell; panels load on their own
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("dashboard"))
+        for name in ("totals", "status", "payers", "notes", "trends", "underpayment", "distinct"):
+            self.assertContains(response, reverse("dashboard-panel", args=[name]))
+        # totals, status and payers share one rollup query
+        with self.assertNumQueries(1):
+            for name in ("totals", "status", "payers"):
+                self.assertEqual(self.panel(name).status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.panel("notes")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        # latest service date, the rollup months, payer and status options
+        with self.assertNumQueries(4):
+            response = self.panel("trends")
+        self.assertIn('desc="trends"', response["Server-Timing"])
+        self.assertEqual(self.panel("nope").status_code, 404)
+
+
+class UnderpaymentSketchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(200)
+        rollup.rebuild()
+
+    def assertClose(self, approx, exact):
+        self.assertLessEqual(abs(float(approx) - float(exact)), ACCURACY * abs(float(exact)) + 0.01)
+
+    def test_percentiles_within_relative_accuracy(self):
+        overall, by_payer = rollup.underpayment_sketches()
+        for sketch, qs in [(overall, Claim.objects.all())] + [
+            (s, Claim.objects.filter(payer=p)) for p, s in by_payer.items()
+        ]:
+            values = sorted(qs.values_list("underpayment", flat=True))
+            self.assertEqual(sketch.n, len(values))
+            for q in (0.5, 0.9, 0.99):
+                self.assertClose(sketch.quantile(q), values[int(q * (len(values) - 1))])
+
+    def test_merged_payers_equal_overall_and_values_can_be_removed(self):
+        overall, by_payer = rollup.underpayment_sketches()
+        merged = LogSketch()
+        for s in by_payer.values():
+            merged.merge(s)
+        self.assertEqual(+merged.counts, +overall.counts)
+        claim = Claim.objects.filter(payer="Aetna").first()
+        claim.delete()
+        self.assertEqual(rollup.underpayment_sketches()[1]["Aetna"].n, by_payer["Aetna"].n - 1)
+
+
+class DistinctSketchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims(300)
+        claims = list(Claim.objects.order_by("pk"))
+        ClaimDetail.objects.bulk_create(
+            ClaimDetail(claim=c, cpt_codes=f"{99200 + i % 50},{80000 + i % 7}") for i, c in enumerate(claims)
+        )
+        rollup.rebuild()
+
+    def assertClose(self, approx, exact):
+        self.assertLessEqual(abs(approx - exact), 0.05 * exact + 1)
+
+    def test_counts_for_any_payer_month_combination(self):
+        combos = [(None, None), (["Aetna"], None), (None, [date(2022, 3, 1)]), (["Aetna", "Cigna"], [date(2022, 3, 1)])]
+        for payers, months in combos:
+            claims = Claim.objects.all()
+            if payers:
+                claims = claims.filter(payer__in=payers)
+            if months:
+                claims = claims.filter(service_date__in=months)  # make_claims uses the 1st of each month
+            patients, codes = rollup.distinct_counts(payers, months)
+            self.assertClose(patients, claims.values("patient_name").distinct().count())
+            exact_codes = {c for d in ClaimDetail.objects.filter(claim__in=claims) for c in d.cpt_list()}
+            self.assertClose(codes, len(exact_codes))
+
+    def test_writes_add_to_sketches(self):
+        before = rollup.distinct_counts(["Humana"])
+        claim = Claim.objects.create(claim_id="X3", patient_name="Brand New", payer="Humana", amount=Decimal("10.00"),
+                                     paid_amount=Decimal("0.00"), status="Denied", service_date=date(2022, 5, 6))
+        ClaimDetail.objects.create(claim=claim, cpt_codes="11111;22222")
+        self.assertEqual(before, (0, 0))
+        self.assertEqual(rollup.distinct_counts(["Humana"], [date(2022, 5, 1)]), (1, 2))
+
+    def test_saves_that_keep_payer_month_and_patient_skip_the_sketches(self):
+        claim = Claim.objects.get(claim_id="30004")
+        claim.status, claim.service_date = "Appealed", claim.service_date.replace(day=20)
+        table = DistinctSketch._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            claim.save()
+        self.assertFalse([q for q in queries if table in q["sql"]])
+        claim.patient_name = "Renamed Patient"
+        with CaptureQueriesContext(connection) as queries:
+            claim.save()
+        self.assertTrue([q for q in queries if table in q["sql"]])
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ClaimTrendsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        rollup.rebuild()
+
+    def setUp(self):
+        cache.clear()
+
+    def trends(self, **params):
+        return self.client.get(reverse("claim-trends"), {"format": "json", **params}).json()
+
+    def test_monthly_trends_match_claims(self):
+        data = self.trends(start="2022-01-01", end="2022-12-31")
+        self.assertEqual(len(data["periods"]), 12)
+        (series,) = data["series"]
+        for period, n, billed, rate in zip(data["periods"], series["claims"], series["billed"], series["denial_rate"]):
+            claims = Claim.objects.filter(service_date__year=2022, service_date__month=int(period[5:7]))
+            self.assertEqual(n, claims.count())
+            self.assertEqual(billed, float(sum(c.amount for c in claims)))
+            self.assertEqual(rate, round(100 * claims.filter(status="Denied").count() / n, 1))
+
+    def test_weekly_series_per_payer(self):
+        data = self.trends(grain="week", payer=["Aetna", "Cigna"], start="2022-01-01", end="2022-12-31")
+        self.assertEqual([s["payer"] for s in data["series"]], ["Aetna", "Cigna"])
+        for s in data["series"]:
+            self.assertEqual(sum(s["claims"]), Claim.objects.filter(payer=s["payer"]).count())
+        # unknown payers are dropped from the filter rather than failing the request
+        self.assertEqual([s["payer"] for s in self.trends(payer="Nobody")["series"]], [""])
+
+    def test_monthly_cost_does_not_grow_with_claims(self):
+        with CaptureQueriesContext(connection) as before:
+            self.trends(status="Denied")
+        make_claims(40)
+        rollup.rebuild()
+        cache.clear()
+        with self.assertNumQueries(len(before)):
+            response = self.client.get(reverse("claim-trends"), {"status": "Denied"})
+        self.assertContains(response, 'class="trend-bar"')
+
+
+@unittest.skipIf(analytics.np is None, "numpy is not installed")
+@override_settings(STORAGES=PLAIN_STATIC, CLAIMS_PREFETCH_WORKERS=0, CLAIMS_ANALYTICS=True)
+class ClaimAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        cls.user = get_user_model().objects.create_user("reviewer", password="x")
+
+    def setUp(self):
+        cache.clear()
+        analytics.reset()
+        self.addCleanup(analytics.reset)
+
+    def assertMatchesRollup(self):
+        rollup.rebuild()
+        self.assertEqual(analytics.totals(), rollup.totals())
+
+    def test_snapshot_follows_writes_incrementally(self):
+        self.assertMatchesRollup()
+        self.client.force_login(self.user)
+        claim = Claim.objects.get(claim_id="30004")
+        claim.status, claim.amount = "Appealed", Decimal("12.34")
+        claim.save()
+        Claim.objects.get(claim_id="30005").delete()
+        Claim.objects.create(claim_id="X2", patient_name="New", payer="Humana", amount=Decimal("5.00"),
+                             paid_amount=Decimal("7.50"), status="Paid", service_date=date(2022, 3, 1))
+        self.client.post(reverse("claim-flag", args=[claim.pk]))
+        self.client.post(reverse("claim-bulk"), {"payer": "Cigna", "action": "status", "to_status": "Paid"})
+        self.assertMatchesRollup()
+        # nothing changed since: served without touching the database
+        with self.assertNumQueries(0):
+            analytics.totals()
+
+    def test_loads_and_catches_up_in_chunks(self):
+        with mock.patch("claims.analytics.LOAD_CHUNK", 7):
+            self.assertMatchesRollup()
+            Claim.objects.filter(payer="Aetna").update(last_updated=timezone.now(), paid_amount=Decimal("1.00"))
+            bump_claims_version()
+            self.assertMatchesRollup()
+
+    def test_ad_hoc_filters(self):
+        analytics.totals()
+        with analytics._lock:
+            snapshot = analytics._current()
+        mask = snapshot.where(payer="Aetna", service_from=date(2022, 3, 1), service_to=date(2022, 8, 31))
+        claims = Claim.objects.filter(payer="Aetna", service_date__range=(date(2022, 3, 1), date(2022, 8, 31)))
+        overall = snapshot.overall(mask)
+        self.assertEqual(overall["claims"], claims.count())
+        self.assertEqual(overall["billed"], sum(c.amount for c in claims))
+        self.assertEqual(snapshot.overall(snapshot.where(payer="Nobody"))["claims"], 0)
+
+    def test_dashboard_uses_snapshot(self):
+        analytics.totals()
+        with self.assertNumQueries(0):
+            agg = self.client.get(reverse("dashboard-panel", args=["totals"])).context["agg"]
+        self.assertEqual(agg["total_claims"], Claim.objects.count())
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_is_served_while_another_worker_recomputes(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(single_flight("k", compute, ttl=60, version=1), 1)
+        self.assertEqual(single_flight("k", compute, ttl=60, version=1), 1)  # fresh hit
+        cache.add("k:lock", 1)  # another worker is recomputing
+        self.assertEqual(single_flight("k", compute, ttl=60, version=2), 1)  # stale, not recomputed
+        cache.delete("k:lock")
+        self.assertEqual(single_flight("k", compute, ttl=60, version=2), 2)
+        self.assertEqual(len(calls), 2)
+
+
+class ClaimCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        recount_claims()
+
+    def test_exact_below_the_threshold(self):
+        count = count_claims(Claim.objects.filter(status="Denied"))
+        self.assertTrue(count.exact)
+        self.assertEqual((int(count), str(count)), (14, "14"))
+
+    def test_estimates_above_the_threshold(self):
+        unfiltered = count_claims(Claim.objects.all(), threshold=10)
+        self.assertTrue(unfiltered.approximate)
+        self.assertEqual((int(unfiltered), str(unfiltered)), (40, "≈40"))
+        # filtered sets on SQLite are only known to pass the threshold
+        filtered = count_claims(Claim.objects.filter(status="Denied"), threshold=10)
+        self.assertTrue(filtered.lower_bound)
+        self.assertEqual((int(filtered), str(filtered)), (10, "10+"))
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class ClaimAdminPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_claims()
+        cls.admin = get_user_model().objects.create_superuser("admin", password="x")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        for patch in (mock.patch("claims.counting.EXACT_COUNT_THRESHOLD", 10),
+                      mock.patch.object(ClaimAdmin, "list_per_page", 5)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def page(self, p):
+        return self.client.get(reverse("admin:claims_claim_changelist"), {"status__exact": "Denied", "p": p})
+
+    def test_pages_past_the_estimate_stay_reachable(self):
+        # 14 Denied claims, estimated as "10+" (two pages of five)
+        first = self.page(1)
+        self.assertContains(first, "is an estimate")
+        self.assertContains(first, "10+")
+        self.assertContains(self.page(2), "p=3")
+        last = self.page(3)
+        self.assertEqual(last.status_code, 200)
+        self.assertEqual(len(last.context["cl"].result_list), 4)
+        self.assertRedirects(self.page(4), reverse("admin:claims_claim_changelist") + "?e=1",
+                             fetch_redirect_response=False)
@@ -0,0 +1,147 @@
+"""
+Billed / paid / denial-rate time series over service_date.
+
+Monthly series read the ClaimRollup buckets, so their cost follows the number
+of (payer, status, month) buckets in the window, not the number of claims.
+Weekly buckets are finer than the rollup and aggregate Claim over a bounded
+service_date range instead (a range scan on the service_date indexes), so
+their cost follows the claims inside the window only, capped at MAX_PERIODS.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncWeek
+
+from .models import Claim, ClaimRollup
+
+DENIED = "Denied"
+
+GRAINS = {"month": "Monthly", "week": "Weekly"}
+
+# periods shown when no start date is given, and the widest window allowed
+DEFAULT_PERIODS = 12
+MAX_PERIODS = {"month": 120, "week": 104}
+
+
+def period_start(d, grain):
+    """First day of the month / Monday of the week containing `d`."""
+    return d.replace(day=1) if grain == "month" else d - timedelta(days=d.weekday())
+
+
+def _next(d, grain):
+    if grain == "week":
+        return d + timedelta(days=7)
+    return d.replace(year=d.year + d.month // 12, month=d.month % 12 + 1)
+
+
+def _back(d, grain, n):
+    if grain == "week":
+        return d - timedelta(days=7 * n)
+    months = d.year * 12 + d.month - 1 - n
+    return d.replace(year=months // 12, month=months % 12 + 1)
+
+
+def latest_service_date():
+    """Newest service_date on file (one index seek), or None without claims."""
+    return Claim.objects.order_by("-service_date").values_list("service_date", flat=True).first()
+
+
+def window(grain, start=None, end=None):
+    """(first, last) period starts for the request, clamped to MAX_PERIODS; None when there is no data."""
+    end = end or latest_service_date()
+    if end is None:
+        return None
+    last = period_start(end, grain)
+    oldest = _back(last, grain, MAX_PERIODS[grain] - 1)
+    first = period_start(start, grain) if start else _back(last, grain, DEFAULT_PERIODS - 1)
+    return max(first, oldest), last
+
+
+def _grouped(grain, payers, status, first, last):
+    if grain == "month":
+        qs = ClaimRollup.objects.filter(claims__gt=0, month__gte=first, month__lte=last)
+        period = "month"
+        measures = {
+            "n_claims": Sum("claims"), "n_billed": Sum("billed"), "n_paid": Sum("paid"),
+            "n_denied": Sum("claims", filter=Q(status=DENIED)),
+        }
+    else:
+        qs = Claim.objects.filter(service_date__gte=first, service_date__lt=_next(last, grain))
+        qs = qs.annotate(period=TruncWeek("service_date"))
+        period = "period"
+        measures = {
+            "n_claims": Count("pk"), "n_billed": Sum("amount"), "n_paid": Sum("paid_amount"),
+            "n_denied": Count("pk", filter=Q(status=DENIED)),
+        }
+    if status:
+        qs = qs.filter(status=status)
+    if payers:
+        qs = qs.filter(payer__in=payers)
+    for row in qs.order_by().values(period, *(["payer"] if payers else [])).annotate(**measures):
+        yield row[period], row.get("payer", ""), row
+
+
+def series(grain="month", payers=(), status="", start=None, end=None):
+    """
+    Trends from one grouped query (plus an index seek when `end` is left
+    out), as plain (JSON-ready) values:
+    {"grain", "periods": [ISO dates], "series": [{"payer", "claims", "billed",
+    "paid", "denial_rate"}]} with one series per requested payer (or a single
+    "" series over all payers) and each column aligned with "periods"; empty
+    periods count zero claims and have no denial rate.
+    """
+    bounds = window(grain, start, end)
+    if bounds is None:
+        return {"grain": grain, "periods": [], "series": []}
+    first, last = bounds
+    periods = []
+    d = first
+    while d <= last:
+        periods.append(d)
+        d = _next(d, grain)
+    slot = {p: i for i, p in enumerate(periods)}
+    names = list(payers) or [""]
+    cols = {
+        name: {"claims": [0] * len(periods), "billed": [0] * len(periods),
+               "paid": [0] * len(periods), "denied": [0] * len(periods)}
+        for name in names
+    }
+    for period, payer, row in _grouped(grain, payers, status, first, last):
+        i, col = slot[period], cols[payer]
+        col["claims"][i] += row["n_claims"]
+        col["billed"][i] += row["n_billed"] or 0
+        col["paid"][i] += row["n_paid"] or 0
+        col["denied"][i] += row["n_denied"] or 0
+    return {
+        "grain": grain,
+        "periods": [p.isoformat() for p in periods],
+        "series": [
+            {
+                "payer": name,
+                "claims": col["claims"],
+                "billed": [round(float(v), 2) for v in col["billed"]],
+                "paid": [round(float(v), 2) for v in col["paid"]],
+                "denial_rate": [round(100 * d / n, 1) if n else None for d, n in zip(col["denied"], col["claims"])],
+            }
+            for name, col in cols.items()
+        ],
+    }
+
+
+def chart_rows(data):
+    """Per series, one row per period with bar widths (% of the largest billed total) for the chart fragment."""
+    peak = max((v for s in data["series"] for v in s["billed"]), default=0) or 1
+    return [
+        {
+            "payer": s["payer"],
+            "rows": [
+                {
+                    "period": p, "label": p[:7] if data["grain"] == "month" else p,
+                    "claims": n, "billed": b, "paid": pd, "denial_rate": dr,
+                    "billed_pct": round(100 * b / peak, 1), "paid_pct": round(100 * pd / peak, 1),
+                }
+                for p, n, b, pd, dr in zip(data["periods"], s["claims"], s["billed"], s["paid"], s["denial_rate"])
+            ],
+        }
+        for s in data["series"]
+    ]
@@ -4,19 +4,27 @@ from . import views
 urlpatterns = [
     path("", views.claim_list, name="claim-list"),
     path("claim/<int:pk>/", views.claim_detail, name="claim-detail"),
+    path("claims/suggest/", views.claim_suggest, name="claim-suggest"),
 
     # CRUD
     path("claims/create/", views.claim_create, name="claim-create"),
     path("claims/<int:pk>/update/", views.claim_update, name="claim-update"),
     path("claims/<int:pk>/delete/", views.claim_delete, name="claim-delete"),
 
+    # Bulk actions over the current filter
+    path("claims/bulk/", views.claim_bulk, name="claim-bulk"),
+    path("claims/bulk/<str:job_id>/", views.claim_bulk_progress, name="claim-bulk-progress"),
+
     # Flags & Notes (HTMX)
+    path("claims/<int:pk>/prefetch/", views.claim_prefetch, name="claim-prefetch"),
     path("claims/<int:pk>/flag-toggle/", views.claim_flag_toggle, name="claim-flag"),
     path("claims/<int:pk>/notes/list/", views.notes_list, name="note-list"),
     path("claims/<int:pk>/notes/add/", views.note_add, name="note-add"),
 
     # Dashboard
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/panels/<slug:panel>/", views.dashboard_panel, name="dashboard-panel"),
+    path("dashboard/trends/", views.claim_trends, name="claim-trends"),
 
     path("claims/form/close/", views.claim_form_close, name="claim-form-close"),
 ]
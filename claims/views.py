@@ -1,73 +1,416 @@
+import functools
+import hashlib
+import re
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Sum, Count, F, Q, Value, DecimalField
-from django.db.models.expressions import ExpressionWrapper
-from django.db.models.functions import Coalesce
-from django.http import HttpResponseForbidden
+from django.db.models import Case, Count, Max, Q, Value, When
+from django.http import Http404, HttpResponseBadRequest, HttpResponseForbidden
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
 from django.views.decorators.http import require_POST
-from django.db.models.functions import Trim
-from django.http import HttpResponse
-
-from .forms import ClaimForm
+from django.http import HttpResponse, JsonResponse
+
+from . import analytics, rollup, trends
+from .bulk import ACTIONS as BULK_ACTIONS, bulk_changes, job_progress, start_bulk
+from .cache import bump_claims_version, claim_version, claims_version, invalidate_claim, single_flight
+from .counting import count_claims
+from .detail import (
+    DETAIL_CACHE_TIMEOUT, detail_cache_key, detail_claims, detail_entry, notes_page, warm_details,
+)
+from .forms import ClaimFilterForm, ClaimForm, TrendsFilterForm
 from .models import Claim, ClaimDetail, ClaimNote
+from .paging import DEFAULT_SORT, keyset_page, neighbours, parse_sort
+from .rows import PK, ROW_FIELDS, render_row, render_rows, row_from_instance
+from .suggest import SUGGEST_LIMIT, patient_index, payer_index
 
 
 # ---------- helpers ----------
+# A claim number is a single token containing at least one digit (e.g. "30001", "CLM-2024-17").
+CLAIM_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+# Rendered table fragments are keyed by the global claims version, so any write
+# invalidates them all at once; the timeout only bounds memory.
+LIST_CACHE_TIMEOUT = 10 * 60
+
+# detail cards warmed in the background for the top rows of each rendered page
+PREFETCH_PAGE_ROWS = 20
+
+# Dashboard numbers move slowly; recompute at most this often (and after claim
+# writes, which change the claims version), one worker at a time.
+DASHBOARD_TTL = 60
+# recent notes also follow the claims version (note writes bump it)
+NOTES_PANEL_TTL = 15
+# month-level history barely moves with a single edit: time-based only
+TRENDS_PANEL_TTL = 10 * 60
+# underpayment percentiles shown on the dashboard
+UNDERPAYMENT_PERCENTILES = (50, 90, 99)
+
+
 def _is_htmx(request):
     """Works whether or not django-htmx middleware is installed."""
-    return getattr(request, "htmx", False) or request.headers.get("HX-Request") == "true"
+    return bool(getattr(request, "htmx", False)) or request.headers.get("HX-Request") == "true"
+
+
+def _looks_like_claim_id(q):
+    return len(q) <= 32 and any(ch.isdigit() for ch in q) and bool(CLAIM_ID_RE.match(q))
+
+
+def _claim_id_prefix(q):
+    """
+    Claims whose claim_id starts with `q`, as an index seek. On Postgres,
+    LIKE 'q%' uses the varchar_pattern_ops index Django adds next to the
+    claim_id btree; a range on the btree itself would follow the column's
+    locale collation, which orders "CLM15" between "CLM-1" and "CLM-2".
+    Elsewhere (SQLite's binary collation, where LIKE is case-insensitive and
+    cannot use the index) the range bounds the seek and startswith keeps the
+    result exact whatever the collation.
+    """
+    qs = Claim.objects.filter(claim_id__startswith=q)
+    if connection.vendor == "postgresql":
+        return qs
+    upper = q[:-1] + chr(ord(q[-1]) + 1)
+    return qs.filter(claim_id__gte=q, claim_id__lt=upper)
+
+
+def _claim_id_matches(q):
+    """
+    Indexed lookup for claim-number searches: exact match first, then a
+    prefix seek (see _claim_id_prefix). Returns None when nothing matches so
+    the caller can fall back to the general search.
+    """
+    exact = Claim.objects.filter(claim_id=q)
+    if exact.exists():
+        return exact
+    prefix = _claim_id_prefix(q)
+    if prefix.exists():
+        return prefix
+    return None
+
+
+def _list_cache_key(kind, **params):
+    """Cache key from normalized params + the global claims version (O(1) invalidation)."""
+    digest = hashlib.sha1(urlencode(sorted(params.items())).encode()).hexdigest()
+    return f"claims:{kind}:{claims_version()}:{digest}"
+
+
+def _distinct_options(field):
+    """Distinct values of an indexed column for a filter <select>, cached per claims version."""
+    key = _list_cache_key("options", field=field)
+    values = cache.get(key)
+    if values is None:
+        values = sorted(
+            {v for v in Claim.objects.order_by().values_list(field, flat=True).distinct() if v},
+            key=str.lower,
+        )
+        cache.set(key, values, LIST_CACHE_TIMEOUT)
+    return values
 
 
-# ---------- list & detail ----------
-def claim_list(request):
-    q = (request.GET.get("q") or "").strip()
-    status_sel = (request.GET.get("status") or "").strip()
+def _validators(*parts, last_modified=None):
+    """ETag over `parts` + Last-Modified timestamp for a fragment."""
+    raw = "|".join(str(p) for p in parts)
+    etag = f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+    ts = int(last_modified.timestamp()) if last_modified else None
+    return etag, ts
 
-    qs = Claim.objects.all().order_by("-last_updated")
 
-    # --- search ---
-    if q:
-        qs = qs.filter(
-            Q(claim_id__icontains=q) |
-            Q(patient_name__icontains=q) |
-            Q(payer__icontains=q)
-        )
+def _conditional(request, etag, ts, render_fn):
+    """304 when If-None-Match/If-Modified-Since still match, else render_fn()."""
+    response = get_conditional_response(request, etag=etag, last_modified=ts)
+    if response is None:
+        response = render_fn()
+    response["ETag"] = etag
+    if ts:
+        response["Last-Modified"] = http_date(ts)
+    # always revalidate: the validators are cheap, stale fragments are not
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ["HX-Request"])
+    return response
 
-    # --- status options (no choices on model -> build from DB) ---
-    # Pull raw statuses, trim in DB where available, then dedupe/sort in Python.
-    raw_statuses = list(
-        Claim.objects.exclude(status__isnull=True)
-             .annotate(_s=Trim("status"))
-             .values_list("_s", flat=True)
-    )
-    statuses = sorted(
-        { (s or "").strip() for s in raw_statuses if (s or "").strip() },
-        key=lambda s: s.lower()
-    )
 
-    # --- apply status filter ---
-    if status_sel:
-        qs = qs.annotate(_s=Trim("status")).filter(_s__iexact=status_sel)
+def _filtered_claims(form):
+    spec = form.spec
+    q = spec.get("q", "")
+    qs = None
 
+    # --- search ---
+    # Claim numbers (the common call-center case) go through an indexed lookup;
+    # everything else, or a claim number with no hits, uses the icontains search.
+    if q and _looks_like_claim_id(q):
+        qs = _claim_id_matches(q)
+
+    if qs is None:
+        qs = Claim.objects.all()
+        if q:
+            qs = qs.filter(
+                Q(claim_id__icontains=q) |
+                Q(patient_name__icontains=q) |
+                Q(payer__icontains=q)
+            )
+
+    # --- structured filters (status, payer, ranges, flagged, underpaid, has notes) ---
+    return form.filter_queryset(qs)
+
+
+# sort choices for the filter form; table headers link to the same keys
+SORT_LABELS = {
+    "updated": "Last updated", "billed": "Billed", "paid": "Paid",
+    "underpayment": "Underpayment", "service_date": "Service date",
+    "payer": "Payer", "patient": "Patient",
+}
+SORT_OPTIONS = [(f"{d}{k}", f"{label} {a}") for k, label in SORT_LABELS.items() for d, a in (("-", "↓"), ("", "↑"))]
+# table columns in order; "" = not sortable (no supporting index)
+SORT_COLUMNS = ["", "patient", "payer", "billed", "paid", "", "service_date"]
+TABLE_LABELS = ["Claim ID", "Patient", "Payer", "Billed", "Paid", "Status", "Service date"]
+
+
+def _sort_headers(form):
+    """Header cells with the link that sorts by them (toggling direction when active)."""
+    key, desc = parse_sort(form.spec.get("sort"))
+    out = []
+    for sort_key, label in zip(SORT_COLUMNS, TABLE_LABELS):
+        cell = {"label": label, "qs": "", "arrow": ""}
+        if sort_key:
+            active = sort_key == key
+            cell["qs"] = urlencode(form.params(sort=sort_key if active and desc else f"-{sort_key}"))
+            cell["arrow"] = ("▼" if desc else "▲") if active else ""
+        out.append(cell)
+    return out
+
+
+def _sort_select(form, oob=False):
+    key, desc = parse_sort(form.spec.get("sort"))
+    return render_to_string("includes/sort_select.html", {
+        "sort_options": SORT_OPTIONS,
+        "sort": f"{'-' if desc else ''}{key}",
+        "oob": oob,
+    })
+
+
+def _render_claim_table(request, qs, form, cursor):
+    rows, next_cursor = keyset_page(qs, cursor, form.spec.get("sort", DEFAULT_SORT))
+    # the reviewer usually opens rows from the top; have their cards ready
+    warm_details([r[PK] for r in rows[:PREFETCH_PAGE_ROWS]], request.user.is_authenticated)
     ctx = {
-        "claims": qs,
-        "q": q,
-        "status_sel": status_sel,
-        "statuses": statuses,
+        "rows_html": render_rows(rows, urlencode(form.params(nav="1"))),
+        "headers": _sort_headers(form),
+        "first_qs": urlencode(form.params()) if cursor else "",
+        "next_qs": urlencode(form.params(cursor=next_cursor)) if next_cursor else "",
     }
+    return render_to_string("includes/claim_table.html", ctx, request)
+
+
+def _facets(form, claims):
+    """
+    Result count plus status / payer / flagged counts for the current filters,
+    cached under the same claims-version key scheme as the table; `claims`
+    returns the filtered queryset and is only called on a miss. Small result
+    sets get exact counts from ONE grouped query (which also yields the newest
+    last_updated used as a list validator); large ones get an estimated total
+    and no breakdown, so a broad search never scans millions of rows.
+    """
+    key = _list_cache_key("facets", **form.params(sort=""))
+    facets = cache.get(key)
+    if facets is None:
+        qs = claims()
+        count = count_claims(qs)
+        facets = {"count": count, "flagged": 0, "status": None, "payer": None}
+        if not count.exact:
+            # walk the last_updated index down to the first match (LIMIT 1), not a scan
+            facets["last"] = qs.order_by("-last_updated").values_list("last_updated", flat=True).first()
+            cache.set(key, facets, LIST_CACHE_TIMEOUT)
+            return facets
+        grouped = (
+            qs.order_by()
+              .values("status", "payer", "flagged")
+              .annotate(n=Count("pk"), last=Max("last_updated"))
+              .values_list("status", "payer", "flagged", "n", "last")
+        )
+        status, payer, last = Counter(), Counter(), None
+        for s, p, flagged, n, row_last in grouped:
+            status[s] += n
+            payer[p] += n
+            facets["flagged"] += n if flagged else 0
+            if last is None or row_last > last:
+                last = row_last
+        facets.update(last=last, status=status.most_common(), payer=payer.most_common())
+        cache.set(key, facets, LIST_CACHE_TIMEOUT)
+    return facets
+
+
+def _render_facets(request, form, facets, oob=False):
+    def link(**extra):
+        return urlencode(form.params(**extra))
+
+    authenticated = request.user.is_authenticated
+    return render_to_string("includes/facets.html", {
+        "oob": oob,
+        # bulk actions post the same filter the counts describe
+        "bulk": authenticated,
+        "bulk_params": form.params(sort="") if authenticated else {},
+        "bulk_actions": BULK_ACTIONS,
+        "bulk_statuses": _distinct_options("status") if authenticated else [],
+        "count": facets["count"],
+        "flagged": facets["flagged"],
+        "flagged_qs": link(flagged="1"),
+        "status": [(v, n, link(status=v)) for v, n in facets["status"] or ()],
+        "payer": [(v, n, link(payer=v)) for v, n in facets["payer"] or ()],
+    })
+
+
+# ---------- list & detail ----------
+def claim_list(request):
+    form = ClaimFilterForm(request.GET)
+    spec = form.spec
+    q = spec.get("q", "")
+    cursor = (request.GET.get("cursor") or "").strip()
+
+    # A full-page search for an exact claim number goes straight to the claim.
+    if q and spec.keys() == {"q"} and not cursor and not _is_htmx(request) and _looks_like_claim_id(q):
+        only = list(Claim.objects.filter(claim_id=q).values_list("pk", flat=True)[:2])
+        if len(only) == 1:
+            return redirect("claim-detail", pk=only[0])
+
+    # Repeat views of the same (filters, cursor) are served from cache; the
+    # entry carries its Last-Modified, so a 304 on a hit needs no DB work at all.
+    params = form.params(cursor=cursor)
+    # read before the key (so before rendering): a write racing this request
+    # leaves an ETag that stops matching, never one that matches stale rows
+    version = claims_version()
+    key = _list_cache_key("list", **params)
+    cached = cache.get(key)
+    # the claim-number probes in _filtered_claims query the DB: cache misses only
+    claims = functools.cache(functools.partial(_filtered_claims, form))
+    if cached is None:
+        # the newest last_updated (from the facet queries) is the Last-Modified
+        last = _facets(form, claims)["last"]
+
+        def table():
+            html = _render_claim_table(request, claims(), form, cursor)
+            cache.set(key, (html, last), LIST_CACHE_TIMEOUT)
+            return html
+    else:
+        table_html, last = cached
+
+        def table():
+            return table_html
+
+    # The ETag carries the claims version, since note writes change the rows'
+    # note counts with update(), which leaves last_updated alone, and the auth
+    # state, since the facet panel offers bulk actions to signed-in users only.
+    etag, ts = _validators(*params.items(), version, request.user.is_authenticated, last_modified=last)
 
     if _is_htmx(request):
-        # Return only the table for HTMX swaps
-        return render(request, "includes/claim_table.html", ctx)
+        # Return only the table for HTMX swaps (or 304 if the client's copy is current),
+        # keeping the sort <select> and, for a new search, the facet panel in step out-of-band.
+        def fragment():
+            html = table() + _sort_select(form, oob=True)
+            if not cursor:
+                html += _render_facets(request, form, _facets(form, claims), oob=True)
+            return HttpResponse(html)
+
+        return _conditional(request, etag, ts, fragment)
+
+    return render(request, "claims/claim_list.html", {
+        "table_html": table(),
+        "facets_html": _render_facets(request, form, _facets(form, claims)),
+        "form": form,
+        "q": q,
+        "status_sel": spec.get("status", ""),
+        "payer_sel": spec.get("payer", ""),
+        "sort_select": _sort_select(form),
+        "statuses": _distinct_options("status"),
+        "payers": _distinct_options("payer"),
+    })
+
+def claim_suggest(request):
+    """Typeahead options for the search box, served from the in-process prefix indexes."""
+    q = (request.GET.get("q") or "").strip()
+    ctx = {"payers": [], "patients": []}
+    if len(q) >= 2 and not _looks_like_claim_id(q):
+        ctx["payers"] = payer_index.search(q, SUGGEST_LIMIT)
+        ctx["patients"] = patient_index.search(q, SUGGEST_LIMIT)
+    return render(request, "includes/suggestions.html", ctx)
+
+
+def _detail_nav(request, pk, claim=None):
+    """
+    Back / previous / next for a claim opened from the list. The View link
+    carries the list's filters and sort (plus nav=1); the neighbours come from
+    two single-row keyset seeks, cached per claims version like the table.
+    """
+    form = ClaimFilterForm(request.GET)
+    params = form.params()
+    nav = {"list_qs": urlencode(params), "detail_qs": "", "prev_pk": None, "next_pk": None}
+    if not request.GET.get("nav"):
+        return nav
+    key = _list_cache_key("nav", pk=pk, **params)
+    around = cache.get(key)
+    if around is None:
+        if claim is not None:
+            row = row_from_instance(claim)
+        else:
+            row = Claim.objects.filter(pk=pk).values_list(*ROW_FIELDS).first()
+        around = neighbours(_filtered_claims(form), row, form.spec.get("sort", DEFAULT_SORT)) if row else (None, None)
+        cache.set(key, around, LIST_CACHE_TIMEOUT)
+    nav.update(prev_pk=around[0], next_pk=around[1], detail_qs=urlencode(form.params(nav="1")))
+    return nav
 
-    return render(request, "claims/claim_list.html", ctx)
 
 def claim_detail(request, pk):
-    """Detail card (full page or HTMX partial)."""
-    claim = get_object_or_404(Claim, pk=pk)
-    detail = ClaimDetail.objects.filter(claim=claim).first()
-    template = "includes/claim_detail.html" if _is_htmx(request) else "claims/claim_detail.html"
-    return render(request, template, {"claim": claim, "detail": detail})
+    """
+    Detail card (full page or HTMX partial) in one response: the claim, its
+    detail row and the validators come from one query, the first page of notes
+    (with authors) from a second. The rendered fragment is cached per claim
+    version (and often warmed ahead, see claims.detail), so repeat opens touch
+    neither the DB nor the template engine.
+    Opened from the list, it also links to the previous/next claim of that
+    list (see _detail_nav). 304 when claim, notes and neighbours are unchanged:
+    the claim version is part of the ETag, since writes that keep the stamps
+    (deleting an older note, editing the detail row) still change the card.
+    """
+    claim = None
+    authenticated = request.user.is_authenticated
+    version = claim_version(pk)
+    key = detail_cache_key(pk, version, authenticated)
+    cached = cache.get(key)
+    if cached is None:
+        claim = detail_claims().filter(pk=pk).first()
+        if claim is None:
+            raise Http404("No Claim matches the given query.")
+        claim_id, stamp = claim.claim_id, (claim.last_updated, claim.last_note_at)
+
+        def render_fragment():
+            entry = detail_entry(claim, version, authenticated)
+            cache.set(key, entry, DETAIL_CACHE_TIMEOUT)
+            return entry[3]
+    else:
+        claim_id, stamp, version, html = cached
+
+        def render_fragment():
+            return html
+
+    nav = _detail_nav(request, pk, claim)
+    etag, ts = _validators(
+        _is_htmx(request), request.user.pk, pk, version, *stamp, *nav.values(),
+        last_modified=max(t for t in stamp if t),
+    )
+
+    def render_detail():
+        ctx = {"claim_id": claim_id, "body_html": mark_safe(render_fragment()), **nav}
+        template = "includes/claim_detail.html" if _is_htmx(request) else "claims/claim_detail.html"
+        return render(request, template, ctx)
+
+    return _conditional(request, etag, ts, render_detail)
 
 
 # ---------- create/update/delete ----------
@@ -79,7 +422,9 @@ def claim_create(request):
             obj = form.save()
             if _is_htmx(request):
                 detail = ClaimDetail.objects.filter(claim=obj).first()
-                return render(request, "includes/claim_detail.html", {"claim": obj, "detail": detail})
+                return render(request, "includes/claim_detail.html", {
+                    "claim": obj, "detail": detail, "authenticated": True,
+                })
             return redirect("claim-detail", pk=obj.pk)
         if _is_htmx(request):
             return render(request, "includes/claim_form.html", {"form": form})
@@ -96,10 +441,18 @@ def claim_update(request, pk):
     if request.method == "POST":
         form = ClaimForm(request.POST, instance=obj)
         if form.is_valid():
-            obj = form.save()
+            # only the edited fields: a flag toggled meanwhile must not be written back
+            obj = form.save(commit=False)
+            obj.save(update_fields=[*form.changed_data, "last_updated"])
             if _is_htmx(request):
+                # one row + the card, swapped out-of-band; the table is not re-rendered
                 detail = ClaimDetail.objects.filter(claim=obj).first()
-                return render(request, "includes/claim_detail.html", {"claim": obj, "detail": detail})
+                return render(request, "includes/claim_saved.html", {
+                    "claim": obj,
+                    "detail": detail,
+                    "authenticated": True,
+                    "row_html": mark_safe(render_row(row_from_instance(obj), oob=True)),
+                })
             return redirect("claim-detail", pk=obj.pk)
     else:
         form = ClaimForm(instance=obj)
@@ -113,31 +466,119 @@ def claim_update(request, pk):
 def claim_delete(request, pk):
     obj = get_object_or_404(Claim, pk=pk)
     if request.method == "POST":
+        pk, claim_id = obj.pk, obj.claim_id
         obj.delete()
         if _is_htmx(request):
-            return claim_list(request)  # return refreshed table
+            # remove just this row (and any open card) out-of-band
+            return render(request, "includes/claim_deleted.html", {"pk": pk, "claim_id": claim_id})
         return redirect("claim-list")
     template = "includes/confirm_delete.html" if _is_htmx(request) else "claims/confirm_delete.html"
     return render(request, template, {"obj": obj})
 
 
+# ---------- bulk actions ----------
+@require_POST
+@login_required
+def claim_bulk(request):
+    """
+    Flag / unflag / set status on every claim matching the posted filter spec
+    (the same params as claim_list). Small sets finish in this request; larger
+    ones return a fragment that polls claim_bulk_progress.
+    """
+    form = ClaimFilterForm(request.POST)
+    changes = bulk_changes(request.POST.get("action"), (request.POST.get("to_status") or "").strip())
+    if changes is None:
+        return HttpResponseBadRequest("Choose a bulk action (and a status to set).")
+    job = start_bulk(_filtered_claims(form), changes, urlencode(form.params()))
+    return render(request, "includes/bulk_progress.html", {"job": job})
+
+
+@login_required
+def claim_bulk_progress(request, job_id):
+    job = job_progress(job_id)
+    if job is None:
+        raise Http404("No such bulk job.")
+    return render(request, "includes/bulk_progress.html", {"job": job})
+
+
 # ---------- flags & notes (HTMX endpoints) ----------
+def _update_returning_supported():
+    # Postgres always; SQLite from 3.35 (MariaDB only has INSERT/DELETE ... RETURNING)
+    return connection.vendor == "postgresql" or (
+        connection.vendor == "sqlite" and connection.features.can_return_columns_from_insert
+    )
+
+
+def _toggle_flag(pk):
+    """
+    Flip `flagged` in ONE conditional UPDATE (flagged = NOT flagged), so two
+    concurrent toggles apply twice instead of both writing the same value.
+    Returns the updated claim (ROW_FIELDS loaded) or None. The dashboard
+    rollup's flagged count moves in the same transaction. Where UPDATE ...
+    RETURNING exists the new row comes back from the same statement; otherwise
+    it is read back in the same transaction.
+    """
+    # last_updated must move too: it feeds the list/detail validators
+    now = timezone.now()
+    with transaction.atomic():
+        if _update_returning_supported():
+            opts, qn = Claim._meta, connection.ops.quote_name
+            columns = ", ".join(qn((opts.pk if f == "pk" else opts.get_field(f)).column) for f in ROW_FIELDS)
+            flagged, last_updated = qn(opts.get_field("flagged").column), qn(opts.get_field("last_updated").column)
+            claim = next(iter(Claim.objects.raw(
+                f"UPDATE {qn(opts.db_table)} SET {flagged} = NOT {flagged}, {last_updated} = %s "
+                f"WHERE {qn(opts.pk.column)} = %s RETURNING {columns}",
+                [connection.ops.adapt_datetimefield_value(now), pk],
+            )), None)
+        else:
+            updated = Claim.objects.filter(pk=pk).update(
+                flagged=Case(When(flagged=True, then=Value(False)), default=Value(True)),
+                last_updated=now,
+            )
+            claim = Claim.objects.only(*ROW_FIELDS).filter(pk=pk).first() if updated else None
+        if claim is not None:
+            rollup.apply_deltas(rollup.flag_toggled(claim))
+    if claim is not None:
+        # update()/raw SQL send no signals
+        bump_claims_version()
+        invalidate_claim(pk)
+    return claim
+
+
 @require_POST
 @login_required
 def claim_flag_toggle(request, pk):
-    claim = get_object_or_404(Claim, pk=pk)
-    claim.flagged = not claim.flagged
-    claim.save(update_fields=["flagged"])
-    detail = ClaimDetail.objects.filter(claim=claim).first()
-    return render(request, "includes/claim_detail.html", {"claim": claim, "detail": detail})
+    """
+    Swap just the flag button/badge, plus the claim's table row out-of-band.
+    One UPDATE, no reads: the response is built from the returned row, and the
+    claim's detail card is re-rendered into the cache in the background.
+    """
+    claim = _toggle_flag(pk)
+    if claim is None:
+        raise Http404("No Claim matches the given query.")
+    warm_details([pk], request.user.is_authenticated)
+    html = render_to_string("includes/claim_flag.html", {"claim": claim}, request)
+    return HttpResponse(html + render_row(row_from_instance(claim), oob=True))
+
+
+def claim_prefetch(request, pk):
+    """Hovering a row warms its detail card in the background; nothing to swap."""
+    warm_details([pk], request.user.is_authenticated)
+    return HttpResponse(status=204)
 
 
 def notes_list(request, pk):
-    """Return just the notes list fragment for a claim."""
-    claim = get_object_or_404(Claim, pk=pk)
-    # NOTE: your model uses `author` (not `user`)
-    notes = claim.notes.select_related("author").order_by("-created_at")
-    return render(request, "includes/notes_list.html", {"claim": claim, "notes": notes})
+    """
+    One page of a claim's notes (newest first). With ?before=<cursor> it is the
+    next older page, which replaces the "Older notes" button it was loaded by.
+    """
+    if not Claim.objects.filter(pk=pk).exists():
+        raise Http404("No Claim matches the given query.")
+    before = request.GET.get("before")
+    notes, older_url = notes_page(pk, before)
+    return render(request, "includes/notes_list.html", {
+        "notes": notes, "older_url": older_url, "continued": bool(before),
+    })
 
 
 @login_required
@@ -147,45 +588,150 @@ def note_add(request, pk):
     claim = get_object_or_404(Claim, pk=pk)
     body = (request.POST.get("body") or "").strip()
     if body:
-        ClaimNote.objects.create(claim=claim, author=request.user, body=body)
+        # the note and Claim.note_count / last_note_at (signals.note_created) commit together
+        with transaction.atomic():
+            ClaimNote.objects.create(claim=claim, author=request.user, body=body)
     if _is_htmx(request):
         return notes_list(request, pk)
     return redirect("claim-detail", pk=pk)
 
 
 # ---------- dashboard ----------
-def dashboard(request):
-    """Tiny admin dashboard with counts and sums."""
-    money = DecimalField(max_digits=14, decimal_places=2)
-    underpay_expr = ExpressionWrapper(F("amount") - F("paid_amount"), output_field=money)
-
-    qs = Claim.objects.all()
-    agg = qs.aggregate(
-        total_claims=Count("id"),
-        total_flagged=Count("id", filter=Q(flagged=True)),
-        sum_billed=Coalesce(Sum("amount"), Value(0, output_field=money), output_field=money),
-        sum_paid=Coalesce(Sum("paid_amount"), Value(0, output_field=money), output_field=money),
-        avg_underpay=Avg(underpay_expr, filter=Q(amount__gt=F("paid_amount"))),
+def _rollup_totals():
+    """
+    rollup.totals() shared by the totals, status and payer panels: whichever
+    loads first runs the one query, the others (and other users) reuse it
+    until the claims version moves. With CLAIMS_ANALYTICS on, the in-process
+    NumPy snapshot answers instead.
+    """
+    snapshot_totals = analytics.totals(limit=10)
+    if snapshot_totals is not None:
+        return snapshot_totals
+    return single_flight(
+        "claims:dashboard:totals", lambda: rollup.totals(limit=10), DASHBOARD_TTL, version=claims_version(),
     )
 
-    status_counts = qs.values("status").annotate(n=Count("id")).order_by("-n")[:10]
-    top_payers = (
-        qs.values("payer")
-          .annotate(
-              n=Count("id"),
-              billed=Coalesce(Sum("amount"), Value(0, output_field=money), output_field=money),
-              paid=Coalesce(Sum("paid_amount"), Value(0, output_field=money), output_field=money),
-          )
-          .order_by("-n")[:10]
+
+def _totals_panel():
+    overall, _, _ = _rollup_totals()
+    return {"agg": {
+        "total_claims": overall["claims"],
+        "total_flagged": overall["flagged"],
+        "sum_billed": overall["billed"],
+        "sum_paid": overall["paid"],
+        # average shortfall over underpaid claims only
+        "avg_underpay": overall["underpayment"] / overall["underpaid"] if overall["underpaid"] else None,
+    }}
+
+
+def _status_panel():
+    return {"status_counts": _rollup_totals()[1]}
+
+
+def _payers_panel():
+    return {"top_payers": _rollup_totals()[2]}
+
+
+def _notes_panel():
+    return single_flight(
+        "claims:dashboard:notes",
+        lambda: {"recent_notes": list(ClaimNote.objects.select_related("claim", "author").order_by("-created_at")[:8])},
+        NOTES_PANEL_TTL, version=claims_version(),
     )
-    recent_notes = ClaimNote.objects.select_related("claim", "author").order_by("-created_at")[:8]
 
-    return render(request, "claims/dashboard.html", {
-        "agg": agg,
-        "status_counts": status_counts,
-        "top_payers": top_payers,
-        "recent_notes": recent_notes,
-    })
+
+def _trends_panel():
+    return single_flight("claims:dashboard:trends", lambda: {
+        "charts": trends.chart_rows(trends.series()),
+        "grains": trends.GRAINS,
+        "payers": _distinct_options("payer"),
+        "statuses": _distinct_options("status"),
+    }, TRENDS_PANEL_TTL)
+
+
+def _underpayment_panel():
+    def build():
+        overall, by_payer = rollup.underpayment_sketches()
+        ranked = sorted(by_payer.items(), key=lambda kv: (-kv[1].n, kv[0]))[:10]
+        histogram = overall.histogram()
+        peak = max((n for _, n in histogram), default=0) or 1
+        return {
+            "percentiles": UNDERPAYMENT_PERCENTILES,
+            "overall": {"n": overall.n, "quantiles": [overall.quantile(p / 100) for p in UNDERPAYMENT_PERCENTILES]},
+            "payers": [
+                {"payer": name, "n": s.n, "quantiles": [s.quantile(p / 100) for p in UNDERPAYMENT_PERCENTILES]}
+                for name, s in ranked
+            ],
+            "histogram": [{"label": label, "n": n, "pct": round(100 * n / peak, 1)} for label, n in histogram],
+        }
+
+    return single_flight("claims:dashboard:underpayment", build, DASHBOARD_TTL, version=claims_version())
+
+
+def _distinct_panel():
+    def build():
+        overall, payers, months = rollup.distinct_summary(months=12)
+        return {"overall": overall, "by_payer": payers, "by_month": months}
+
+    return single_flight("claims:dashboard:distinct", build, DASHBOARD_TTL, version=claims_version())
+
+
+# panel -> (fragment template, context builder, browser max-age in seconds)
+DASHBOARD_PANELS = {
+    "totals": ("includes/dashboard_totals.html", _totals_panel, 30),
+    "status": ("includes/dashboard_status.html", _status_panel, 30),
+    "payers": ("includes/dashboard_payers.html", _payers_panel, 30),
+    "notes": ("includes/dashboard_notes.html", _notes_panel, 0),
+    "trends": ("includes/dashboard_trends.html", _trends_panel, 300),
+    "underpayment": ("includes/dashboard_underpayment.html", _underpayment_panel, 30),
+    "distinct": ("includes/dashboard_distinct.html", _distinct_panel, 30),
+}
+
+
+def dashboard(request):
+    """Dashboard shell; every panel loads from dashboard_panel in parallel (hx-trigger="load")."""
+    return render(request, "claims/dashboard.html")
+
+
+def dashboard_panel(request, panel):
+    """
+    One dashboard panel fragment, each with its own server cache (see the
+    builders above) and browser max-age. The time spent building its context
+    is reported in a Server-Timing header, so slow panels show up per panel
+    in the browser's network tab.
+    """
+    try:
+        template, build, max_age = DASHBOARD_PANELS[panel]
+    except KeyError:
+        raise Http404("Unknown dashboard panel")
+    started = time.perf_counter()
+    ctx = build()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    resp = render(request, template, ctx)
+    resp["Server-Timing"] = f'panel;desc="{panel}";dur={elapsed_ms:.1f}'
+    if max_age:
+        patch_cache_control(resp, private=True, max_age=max_age)
+    else:
+        patch_cache_control(resp, no_cache=True)
+    return resp
+
+
+def claim_trends(request):
+    """
+    Billed / paid / denial-rate trends by service month or week (see
+    trends.series) as the dashboard chart fragment, or as compact column-wise
+    JSON with ?format=json. Cached per claims version and normalized filter.
+    """
+    form = TrendsFilterForm(request.GET, payers=_distinct_options("payer"))
+    spec = form.spec
+    key = _list_cache_key("trends", **{k: v for k, v in spec.items() if v})
+    data = cache.get(key)
+    if data is None:
+        data = trends.series(**spec)
+        cache.set(key, data, LIST_CACHE_TIMEOUT)
+    if request.GET.get("format") == "json":
+        return JsonResponse(data)
+    return render(request, "includes/trends_chart.html", {"charts": trends.chart_rows(data)})
 
 
 def claim_form_close(request):
@@ -100,6 +100,45 @@ DATABASES = {
     )
 }
 
+# -------------------------------------------------------------------
+# Cache
+#   - Holds the claims version counter and rendered fragments
+#   - Local memory by default (per process); set REDIS_URL to share it
+#     across gunicorn workers and management commands (needs `redis`).
+#     Version-based invalidation only reaches other processes through a
+#     shared cache: with local memory, imports run via manage.py are not
+#     seen by a running server (`manage.py check --deploy` warns).
+# -------------------------------------------------------------------
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "claims",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Threads that pre-render claim detail cards for rows on screen (0 = inline).
+CLAIMS_PREFETCH_WORKERS = int(os.getenv("CLAIMS_PREFETCH_WORKERS", "2"))
+
+# Run bulk actions larger than one chunk on a background thread that the page
+# polls. Progress lives in the cache, so a poll answered by another worker only
+# finds the job when the cache is shared: the default follows REDIS_URL, and
+# without it every bulk action runs inside its request.
+CLAIMS_BULK_BACKGROUND = os.getenv("CLAIMS_BULK_BACKGROUND", "1" if REDIS_URL else "0") == "1"
+
+# Answer dashboard totals from an in-process NumPy snapshot of the claims
+# (claims/analytics.py) instead of SQL; needs `numpy`, ignored without it.
+CLAIMS_ANALYTICS = os.getenv("CLAIMS_ANALYTICS", "0") == "1"
+
 # -------------------------------------------------------------------
 # Password validation
 # -------------------------------------------------------------------